@@ -0,0 +1,237 @@
+import json
+import logging
+import mimetypes
+import secrets
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+# Served files carry their content hash in the name, so they never change
+# under a given URL and browsers may keep them for a year without revalidating.
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Pre-compressed siblings, in order of preference.
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Largest request body an upload endpoint accepts.
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+# Most demo tokens kept at once; the oldest are forgotten first.
+MAX_TOKENS = 10000
+
+# (method, path) -> (handler, public); handler(body, headers, query) returns
+# (status, json-able payload), (status, Path) to send a file, or
+# (status, iterator of bytes) to stream server-sent events. ValueError
+# becomes a 400.
+_routes = {}
+_tokens = OrderedDict()
+_tokens_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def register_route(method, path, handler, public=False):
+    """Expose ``handler`` for ``method`` requests to ``path``.
+
+    Demos are served from the same origin, so they can post to these
+    endpoints with a relative URL. Unless the route is ``public`` (meant
+    for read-only status), a request must carry a token from
+    ``issue_token`` as ``?token=`` or an ``X-Demo-Token`` header, or it is
+    refused with 403. Any page can send a form post or a beacon here, but
+    only the app's own demos know a token. No CORS headers are sent, so
+    other origins cannot read the replies either.
+    """
+    _routes[(method, path)] = (handler, public)
+
+
+def issue_token():
+    """A new token for one app session's demos to call the routes with."""
+    token = secrets.token_urlsafe(24)
+    with _tokens_lock:
+        _tokens[token] = True
+        while len(_tokens) > MAX_TOKENS:
+            _tokens.popitem(last=False)
+    return token
+
+
+def _token_valid(token):
+    with _tokens_lock:
+        return token in _tokens
+
+
+class AssetHandler(SimpleHTTPRequestHandler):
+    """Serve content-hashed build output with long-lived caching headers.
+
+    ``<name>.<hash>.<ext>`` is looked up under the server's root directory;
+    if the client accepts it, a pre-compressed ``.br``/``.gz`` sibling is
+    sent instead of the plain file. Nothing is compressed per request.
+    """
+
+    server_version = "DemoAssets/1.0"
+
+    def do_GET(self):
+        if ("GET", self._route_path()) in _routes:
+            self._dispatch("GET")
+        else:
+            self._send_asset(head_only=False)
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_HEAD(self):
+        self._send_asset(head_only=True)
+
+    def _send_asset(self, head_only):
+        path = self._resolve(self.path.split("?", 1)[0])
+        if path is None:
+            self.send_error(404)
+            return
+
+        etag = '"%s"' % path.stem.rsplit(".", 1)[-1]
+        body_path, encoding = self._negotiate(path)
+        if encoding:
+            etag = etag[:-1] + '-' + encoding + '"'
+
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", IMMUTABLE)
+            self.end_headers()
+            return
+
+        body = body_path.read_bytes()
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type.endswith("javascript"):
+            content_type += "; charset=utf-8"
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", IMMUTABLE)
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def _route_path(self):
+        return self.path.split("?", 1)[0]
+
+    def _dispatch(self, method):
+        route = _routes.get((method, self._route_path()))
+        if route is None:
+            self._send_json(404, {"error": "not found"})
+            return
+        handler, public = route
+        query = dict(parse_qsl(self.path.partition("?")[2]))
+        token = query.pop("token", None) or self.headers.get("X-Demo-Token")
+        if not public and not _token_valid(token):
+            self._send_json(403, {"error": "missing or unknown demo token; reload the app page"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"})
+            return
+        body = self.rfile.read(length) if length else b""
+        try:
+            status, payload = handler(body, self.headers, query)
+        except ValueError as exc:
+            status, payload = 400, {"error": str(exc)}
+        except Exception:
+            logger.exception("%s %s failed", method, self._route_path())
+            status, payload = 500, {"error": "internal server error"}
+        if isinstance(payload, Path):
+            self._send_file(status, payload)
+        elif isinstance(payload, Iterator):
+            self._send_events(status, payload)
+        else:
+            self._send_json(status, payload)
+
+    def _send_events(self, status, events):
+        # HTTP/1.0 without a length: the body ends when the connection closes.
+        self.send_response(status)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            for chunk in events:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away. Closing a generator runs its cleanup,
+            # which is how handlers stop the work behind the stream.
+            pass
+        finally:
+            close = getattr(events, "close", None)
+            if close is not None:
+                close()
+
+    def _send_file(self, status, path):
+        try:
+            body = path.read_bytes()
+        except FileNotFoundError:
+            self._send_json(404, {"error": "file no longer exists"})
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _resolve(self, url_path):
+        root = Path(self.directory).resolve()
+        path = (root / url_path.lstrip("/")).resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def _negotiate(self, path):
+        accepted = {
+            part.split(";", 1)[0].strip()
+            for part in self.headers.get("Accept-Encoding", "").split(",")
+        }
+        for encoding, suffix in ENCODINGS:
+            compressed = path.with_name(path.name + suffix)
+            if encoding in accepted and compressed.is_file():
+                return compressed, encoding
+        return path, None
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_asset_server(root, host="127.0.0.1", port=8765):
+    """Serve ``root`` from a daemon thread and return the running server.
+
+    The server is started once per process; later calls return it as is.
+    Raises ``OSError`` if the address is already in use.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            handler = lambda *args, **kwargs: AssetHandler(*args, directory=str(root), **kwargs)
+            server = ThreadingHTTPServer((host, port), handler)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, name="demo-assets", daemon=True)
+            thread.start()
+            _server = server
+        return _server
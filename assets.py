@@ -0,0 +1,502 @@
+import functools
+import gzip
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from asset_server import issue_token, start_asset_server
+
+DEMO_DIR = Path(__file__).parent / "demos"
+BUILD_DIR = Path(__file__).parent / "build"
+
+# "static" serves hashed files from a local asset server and points the
+# iframes at them; everything that talks back to Python or the server needs
+# it. "inline" (opt-in) embeds display-only documents with components.html.
+ASSET_MODE = os.environ.get("DEMO_ASSET_MODE", "static")
+ASSET_HOST = os.environ.get("DEMO_ASSET_HOST", "127.0.0.1")
+ASSET_PORT = int(os.environ.get("DEMO_ASSET_PORT", "8765"))
+# Public base URL of the asset server, as the browser sees it; unset, it is
+# the host the page was loaded from, on ASSET_PORT.
+ASSET_URL = os.environ.get("DEMO_ASSET_URL")
+
+RUNTIME_CSS = DEMO_DIR / "runtime.css"
+RUNTIME_JS = DEMO_DIR / "runtime.js"
+# How a demo document pulls in the shared runtime.
+RUNTIME_LINK = '<link rel="stylesheet" href="runtime.css">'
+RUNTIME_SCRIPT = '<script src="runtime.js"></script>'
+
+_HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_EMBEDDED = re.compile(r"(<(script|style)\b[^>]*>)(.*?)(</\2\s*>)", re.DOTALL | re.IGNORECASE)
+_LINE_BREAK = re.compile(r"[ \t]*\n\s*")
+_CSS_RULE = re.compile(r"([^{}]+)\{[^{}]*\}")
+_PSEUDO = re.compile(r"::?[\w-]+(\([^)]*\))?")
+# A declaration, or a bracket that changes how deeply nested the code is.
+_JS_TOP = re.compile(r"(?P<open>[{(\[])|(?P<close>[})\]])|(?<![\w$.])(?:async\s+)?"
+                     r"(?:function\s*\*?\s*(?P<function>[\w$]+)|(?:const|let|var|class)\s+(?P<name>[\w$]+))")
+_JS_WORD = re.compile(r"[\w$]+")
+# A "/" after one of these starts a regular expression rather than a division.
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^") | {"", "return", "typeof", "instanceof", "in", "of", "new", "delete",
+                                                 "void", "throw", "case", "do", "else", "yield", "await"}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SharedRuntime:
+    """The CSS/JS every demo links to, trimmed to what the demos use."""
+    css: str
+    js: str
+
+    @property
+    def css_filename(self):
+        return f"runtime.{fingerprint(self.css)}.css"
+
+    @property
+    def js_filename(self):
+        return f"runtime.{fingerprint(self.js)}.js"
+
+
+@dataclass(frozen=True)
+class DemoAsset:
+    """A demo document loaded, minified and fingerprinted once per process.
+
+    ``html`` is self-contained, with the parts of the shared runtime it
+    uses inlined. ``linked_html`` references the shared runtime files
+    instead and is what gets published for the asset server.
+    """
+    name: str
+    html: str
+    linked_html: str
+    fingerprint: str
+    raw_bytes: int
+    runtime_bytes: int
+
+    @property
+    def size(self):
+        return len(self.html.encode("utf-8"))
+
+    @property
+    def linked_size(self):
+        return len(self.linked_html.encode("utf-8"))
+
+    @property
+    def filename(self):
+        return f"{self.name}.{self.fingerprint}.html"
+
+
+def _skip_quoted(js, pos):
+    quote = js[pos]
+    pos += 1
+    while pos < len(js):
+        if js[pos] == "\\":
+            pos += 2
+        elif js[pos] == quote:
+            return pos + 1
+        elif js[pos] == "\n":
+            return pos
+        else:
+            pos += 1
+    return len(js)
+
+
+def _skip_template(js, pos):
+    pos += 1
+    while pos < len(js):
+        if js[pos] == "\\":
+            pos += 2
+        elif js[pos] == "`":
+            return pos + 1
+        elif js.startswith("${", pos):
+            pos = _js_runs(js, pos + 2, nested=True)[1]
+        else:
+            pos += 1
+    return len(js)
+
+
+def _skip_regex(js, pos):
+    pos += 1
+    in_class = False
+    while pos < len(js):
+        char = js[pos]
+        if char == "\\":
+            pos += 2
+            continue
+        if char == "\n":
+            return pos
+        pos += 1
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "/":
+            break
+    match = _JS_WORD.match(js, pos)
+    return match.end() if match else pos
+
+
+def _js_runs(js, pos=0, nested=False):
+    """Split JS into ``(kind, text)`` runs of "code", "literal" and "comment".
+
+    Literals are strings, template literals with their ``${}`` parts, and
+    regular expressions, which are told from a division by the token
+    before the ``/``. With ``nested`` the scan ends after the ``}`` closing
+    a template's ``${``. Returns the runs and the position the scan ended.
+    """
+    runs = []
+    start = pos
+    depth = 0
+    previous = ""
+    while pos < len(js):
+        char = js[pos]
+        kind = "literal"
+        if char in "'\"":
+            end = _skip_quoted(js, pos)
+        elif char == "`":
+            end = _skip_template(js, pos)
+        elif js.startswith("//", pos):
+            close = js.find("\n", pos)
+            kind, end = "comment", len(js) if close < 0 else close
+        elif js.startswith("/*", pos):
+            close = js.find("*/", pos + 2)
+            kind, end = "comment", len(js) if close < 0 else close + 2
+        elif char == "/" and previous in _REGEX_AFTER:
+            end = _skip_regex(js, pos)
+        else:
+            word = _JS_WORD.match(js, pos)
+            if word:
+                previous = word.group()
+                pos = word.end()
+                continue
+            if nested and char == "}" and not depth:
+                if pos > start:
+                    runs.append(("code", js[start:pos]))
+                return runs, pos + 1
+            if not char.isspace():
+                depth += (char == "{") - (char == "}")
+                previous = char
+            pos += 1
+            continue
+        if pos > start:
+            runs.append(("code", js[start:pos]))
+        runs.append((kind, js[pos:end]))
+        if kind == "literal":
+            previous = ")"
+        start = pos = end
+    if pos > start:
+        runs.append(("code", js[start:pos]))
+    return runs, pos
+
+
+def minify_js(js):
+    """Strip comments, indentation and blank lines from JS, leaving literals as they are.
+
+    Line breaks are kept so that code relying on automatic semicolon
+    insertion keeps working.
+    """
+    pieces = []
+    for kind, text in _js_runs(js)[0]:
+        if kind == "comment":
+            kind, text = "code", "" if text.startswith("//") else "\n" if "\n" in text else " "
+        if kind == "code" and pieces and pieces[-1][0] == "code":
+            pieces[-1] = ("code", pieces[-1][1] + text)
+        else:
+            pieces.append((kind, text))
+    return "".join(_LINE_BREAK.sub("\n", text) if kind == "code" else text for kind, text in pieces).strip()
+
+
+def _strip_lines(text):
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def minify_css(css):
+    """Strip comments, indentation and blank lines from a style sheet."""
+    return _strip_lines(_CSS_COMMENT.sub("", css))
+
+
+def minify_html(html):
+    """Strip comments, indentation and blank lines from a demo document.
+
+    Scripts and style sheets go through ``minify_js`` and ``minify_css``;
+    in the markup around them only HTML comments and the whitespace the
+    browser ignores are removed.
+    """
+    parts = []
+    pos = 0
+    for match in _EMBEDDED.finditer(html):
+        parts.append(_strip_lines(_HTML_COMMENT.sub("", html[pos:match.start()])))
+        opening, tag, body, closing = match.groups()
+        body = minify_js(body) if tag.lower() == "script" else minify_css(body)
+        parts.append(f"{opening}\n{body}\n{closing}" if body else opening + closing)
+        pos = match.end()
+    parts.append(_strip_lines(_HTML_COMMENT.sub("", html[pos:])))
+    return "\n".join(part for part in parts if part)
+
+
+def fingerprint(content):
+    """Short content hash used to tell whether a document changed."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+
+
+def demo_names():
+    return sorted(path.stem for path in DEMO_DIR.glob("*.html"))
+
+
+def _selector_used(selector, document):
+    selector = _PSEUDO.sub("", selector)
+    for part in selector.split():
+        tag = re.match(r"[a-zA-Z][\w-]*", part)
+        if tag and not re.search(rf"<{tag.group()}\b", document, re.IGNORECASE):
+            return False
+        for cls in re.findall(r"\.([\w-]+)", part):
+            if not re.search(rf"\b{re.escape(cls)}\b", document):
+                return False
+    return True
+
+
+def shake_css(css, document):
+    """Keep only the rules with a selector that can match ``document``."""
+    rules = []
+    for match in _CSS_RULE.finditer(css):
+        selectors = match.group(1).split(",")
+        if any(_selector_used(selector, document) for selector in selectors):
+            rules.append(match.group(0).strip())
+    return "\n".join(rules)
+
+
+def _top_level_declarations(js):
+    """Yield ``(name, start)`` of each declaration not nested in a block or literal."""
+    masked = "".join(text if kind == "code" else re.sub(r"\S", " ", text) for kind, text in _js_runs(js)[0])
+    depth = 0
+    for match in _JS_TOP.finditer(masked):
+        if match.group("open"):
+            depth += 1
+        elif match.group("close"):
+            depth = max(0, depth - 1)
+        elif not depth:
+            yield match.group("function") or match.group("name"), match.start()
+
+
+def shake_js(js, document):
+    """Keep only the top-level declarations ``document`` reaches.
+
+    A declaration is kept when its name appears in the document or in
+    another kept declaration.
+    """
+    declarations = list(_top_level_declarations(js))
+    chunks = {}
+    for (name, start), following in zip(declarations, declarations[1:] + [(None, len(js))]):
+        chunks[name] = js[start:following[1]].strip()
+
+    used = set()
+    pending = [document]
+    while pending:
+        text = pending.pop()
+        for name, chunk in chunks.items():
+            if name not in used and re.search(rf"(?<![\w$]){re.escape(name)}(?![\w$])", text):
+                used.add(name)
+                pending.append(chunk)
+    return "\n".join(chunk for name, chunk in chunks.items() if name in used)
+
+
+def _source_stamp():
+    return tuple(sorted((path.name, path.stat().st_mtime_ns) for path in DEMO_DIR.iterdir()))
+
+
+def _read(path):
+    return path.read_text(encoding="utf-8")
+
+
+@st.cache_resource(show_spinner=False)
+def _load_runtime(stamp):
+    documents = "\n".join(_read(DEMO_DIR / f"{name}.html") for name in demo_names())
+    css = minify_css(shake_css(_read(RUNTIME_CSS), documents))
+    js = minify_js(shake_js(_read(RUNTIME_JS), documents))
+    return SharedRuntime(css, js)
+
+
+@st.cache_resource(show_spinner=False)
+def _load_demo(name, stamp):
+    raw = _read(DEMO_DIR / f"{name}.html")
+    runtime = _load_runtime(stamp)
+    css = minify_css(shake_css(_read(RUNTIME_CSS), raw))
+    js = minify_js(shake_js(_read(RUNTIME_JS), raw))
+
+    inline, linked = raw, raw
+    if RUNTIME_LINK in raw:
+        inline = inline.replace(RUNTIME_LINK, f"<style>\n{css}\n</style>")
+        linked = linked.replace(RUNTIME_LINK, f'<link rel="stylesheet" href="{runtime.css_filename}">')
+    if RUNTIME_SCRIPT in raw:
+        inline = inline.replace(RUNTIME_SCRIPT, f"<script>\n{js}\n</script>")
+        linked = linked.replace(RUNTIME_SCRIPT, f'<script src="{runtime.js_filename}"></script>')
+    inline, linked = minify_html(inline), minify_html(linked)
+    runtime_bytes = len(inline.encode("utf-8")) - len(linked.encode("utf-8"))
+    return DemoAsset(name, inline, linked, fingerprint(linked), len(raw.encode("utf-8")), runtime_bytes)
+
+
+def load_runtime():
+    return _load_runtime(_source_stamp())
+
+
+def load_demo(name):
+    """Return the cached asset for ``demos/<name>.html``.
+
+    The mtimes of everything in demos/ are part of the cache key, so editing
+    a document or the runtime during development picks up the new version
+    on the next rerun.
+    """
+    return _load_demo(name, _source_stamp())
+
+
+def _write_compressed(path, data):
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    written = [path]
+    path.write_bytes(data)
+    gz_path = path.with_name(path.name + ".gz")
+    gz_path.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    written.append(gz_path)
+    if brotli is not None:
+        br_path = path.with_name(path.name + ".br")
+        br_path.write_bytes(brotli.compress(data, quality=11))
+        written.append(br_path)
+    return written
+
+
+def publish_runtime(runtime, out_dir=BUILD_DIR / "demos"):
+    """Write the shared runtime as ``runtime.<hash>.css/js``."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return (_write_compressed(out_dir / runtime.css_filename, runtime.css.encode("utf-8"))
+            + _write_compressed(out_dir / runtime.js_filename, runtime.js.encode("utf-8")))
+
+
+def publish_demo(asset, out_dir=BUILD_DIR / "demos"):
+    """Write ``asset`` as ``<name>.<hash>.html`` plus pre-compressed siblings.
+
+    A ``.gz`` file is always written; ``.br`` only when the optional
+    ``brotli`` package is installed. Returns the paths written.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return _write_compressed(out_dir / asset.filename, asset.linked_html.encode("utf-8"))
+
+
+@st.cache_resource(show_spinner=False)
+def _published_filename(name, fingerprint):
+    publish_runtime(load_runtime())
+    asset = load_demo(name)
+    publish_demo(asset)
+    return asset.filename
+
+
+def asset_url():
+    """Base URL of the asset server for the browser behind the current request."""
+    if ASSET_URL:
+        return ASSET_URL.rstrip("/")
+    host = re.sub(r":\d+$", "", st.context.headers.get("Host") or "localhost")
+    return f"http://{host}:{ASSET_PORT}"
+
+
+@functools.cache
+def asset_server_running():
+    """Start the asset server once per process.
+
+    Returns False, and the demos fall back to inline documents, when static
+    mode is off or the port cannot be bound.
+    """
+    if ASSET_MODE != "static":
+        return False
+    try:
+        start_asset_server(BUILD_DIR, ASSET_HOST, ASSET_PORT)
+    except OSError as exc:
+        logger.warning("Demo asset server unavailable on %s:%s (%s); inlining demos",
+                       ASSET_HOST, ASSET_PORT, exc)
+        return False
+    return True
+
+
+def _new_events(value, seen):
+    """Return the events in ``value`` that have not been returned before."""
+    if not value:
+        return []
+    if value.get("session") != seen["session"]:
+        seen["session"], seen["id"] = value.get("session"), 0
+    events = [dict(event, session=seen["session"])
+              for event in value.get("events", []) if event["id"] > seen["id"]]
+    if events:
+        seen["id"] = events[-1]["id"]
+    return events
+
+
+def render_demo(name, height, scrolling=False, key=None, **args):
+    """Render a demo document and return the events it sent back.
+
+    Extra keyword ``args`` reach the demo's script as ``BRIDGE.args``.
+
+    In static mode the demo is a declared component loaded from
+    ``<name>.<hash>.html`` on the asset server, which the browser caches
+    until the hash changes. Events the demo emits with ``emitToStreamlit``
+    arrive here in batches; each call returns only the events not seen
+    before in this session, as ``{"id", "type", "payload", "time", "session"}``
+    dicts; ``session`` identifies the page load that sent them. Every demo
+    also gets the app session's ``demo_token``, without which the asset
+    server refuses its state-changing routes.
+
+    Inline, the minified document is byte-identical across reruns, so
+    Streamlit's ForwardMsg cache only sends a reference to it unless its
+    fingerprint changed (see ``global.minCachedMessageSize`` in
+    .streamlit/config.toml). Inline iframes cannot talk back, so the result
+    is always empty.
+    """
+    asset = load_demo(name)
+    if not asset_server_running():
+        components.html(asset.html, height=height, scrolling=scrolling)
+        return []
+
+    key = key or f"demo_{name}"
+    seen = st.session_state.setdefault(f"_{key}_seen", {"session": None, "id": 0})
+    if "_demo_token" not in st.session_state:
+        st.session_state["_demo_token"] = issue_token()
+    component = components.declare_component(f"demo_{name}", url=f"{asset_url()}/demos/{_published_filename(name, asset.fingerprint)}")
+    value = component(key=key, default=None, height=height, scrolling=scrolling,
+                      ack=seen["id"], ack_session=seen["session"], demo_token=st.session_state["_demo_token"],
+                      **args)
+    return _new_events(value, seen)
+
+
+def build(out_dir=BUILD_DIR / "demos"):
+    """Publish every demo and the shared runtime, and report their sizes.
+
+    ``inline`` is the self-contained document, ``linked`` the published one;
+    ``shared`` is what a demo no longer carries itself because it comes from
+    the runtime files, which the browser downloads once for all demos.
+    """
+    runtime = load_runtime()
+    runtime_sizes = {path.name: path.stat().st_size for path in publish_runtime(runtime, out_dir)}
+    print(f"{'demo':16} {'source':>8} {'inline':>8} {'linked':>8} {'shared':>8} {'gzip':>7} {'brotli':>7}  file")
+    inline_total = linked_total = 0
+    for name in demo_names():
+        asset = load_demo(name)
+        sizes = {path.suffix: path.stat().st_size for path in publish_demo(asset, out_dir)}
+        inline_total += asset.size
+        linked_total += asset.linked_size
+        print(f"{name:16} {asset.raw_bytes:8d} {asset.size:8d} {asset.linked_size:8d} "
+              f"{asset.runtime_bytes:8d} {sizes['.gz']:7d} {sizes.get('.br', '-'):>7}  {asset.filename}")
+    for filename in (runtime.css_filename, runtime.js_filename):
+        print(f"{'runtime':16} {'':8} {'':8} {runtime_sizes[filename]:8d} {'':8} "
+              f"{runtime_sizes[filename + '.gz']:7d} {runtime_sizes.get(filename + '.br', '-'):>7}  {filename}")
+    runtime_total = runtime_sizes[runtime.css_filename] + runtime_sizes[runtime.js_filename]
+    print(f"all demos: {inline_total} B inline, {linked_total + runtime_total} B linked "
+          f"({inline_total - linked_total - runtime_total} B saved)")
+
+
+if __name__ == "__main__":
+    build()
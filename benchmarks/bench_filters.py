@@ -0,0 +1,55 @@
+"""Frames/s of the NumPy filter pipeline, per frame and in batches.
+
+The same pipeline runs in the camera demo's worker ("Check Against
+Server" compares the two byte for byte and reports the browser's rate).
+
+Usage::
+
+    python benchmarks/bench_filters.py --size 1280x720 --batches 1,8,32
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from filters import DEFAULT_PIPELINE, parse_pipeline, run_pipeline
+
+
+def frames_per_sec(frames, steps, batch, repeat):
+    """Best rate over ``repeat`` passes through ``frames`` in chunks of ``batch``."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for index in range(0, len(frames), batch):
+            run_pipeline(frames[index:index + batch], steps)
+        best = max(best, len(frames) / (time.perf_counter() - start))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--pipeline", default=DEFAULT_PIPELINE)
+    parser.add_argument("--batches", default="1,8,32")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    width, height = map(int, args.size.split("x"))
+    frames = np.random.default_rng(0).integers(0, 256, (args.frames, height, width, 3), dtype=np.uint8)
+    steps = parse_pipeline(args.pipeline)
+    print(f"{args.frames} frames of {args.size}: {args.pipeline}")
+    print(f"{'batch':>5} {'frames/s':>9}")
+    for batch in map(int, args.batches.split(",")):
+        print(f"{batch:5d} {frames_per_sec(frames, steps, batch, args.repeat):9.1f}")
+    for name, args_ in steps:
+        rate = frames_per_sec(frames, [(name, args_)], 8, args.repeat)
+        print(f"  {name:10} alone: {rate:8.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Throughput and latency of the batch prompt runner under rate limiting.
+
+Runs a generated JSONL batch through BatchRunner against gemini_stub.py
+started in-process, with a share of requests answered 429, at several
+concurrency levels. Each run is interrupted halfway and then resumed from
+its results file, to check that resuming re-sends no finished rows.
+
+Usage::
+
+    python benchmarks/bench_gemini_batch.py --rows 400 --concurrency 4,16 --rpm 6000 --rate-limit 0.1
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gemini_batch import BatchRunner, read_prompts
+from gemini_proxy import GeminiProxy
+from gemini_stub import start_stub
+
+
+class Interrupted(Exception):
+    pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--concurrency", default="4,16")
+    parser.add_argument("--rpm", type=float, default=6000, help="token-bucket rate")
+    parser.add_argument("--rate-limit", type=float, default=0.1, help="share of stub requests answered 429")
+    parser.add_argument("--latency-ms", type=float, default=100, help="stub delay per request")
+    args = parser.parse_args(argv)
+
+    stub = start_stub(latency_ms=args.latency_ms, tokens=100, rate_limit_rate=args.rate_limit)
+    base_url = f"http://127.0.0.1:{stub.server_port}/v1beta"
+    print(f"{args.rows} rows, {args.rate_limit:.0%} answered 429, {args.rpm:g} rpm")
+    print(f"{'conc':>5} {'rows/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'retries':>8} "
+          f"{'failed':>7} {'resumed':>8} {'upstream':>9}")
+    for concurrency in map(int, args.concurrency.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            prompts = Path(tmp) / "prompts.jsonl"
+            prompts.write_text("".join(json.dumps({"id": f"q{index}", "prompt": f"Question {index}"}) + "\n"
+                                       for index in range(args.rows)))
+            rows = read_prompts(prompts)
+            output = Path(tmp) / "results.jsonl"
+            proxy = GeminiProxy(base_url, "stub", pool_size=concurrency)
+            before = stub.requests
+
+            def crash(result, summary):
+                if summary["succeeded"] >= args.rows // 2:
+                    raise Interrupted
+
+            runner = BatchRunner(proxy, concurrency=concurrency, rpm=args.rpm, base_delay=0.05, max_delay=1.0,
+                                 on_result=crash)
+            try:
+                asyncio.run(runner.run(rows, output))
+            except Interrupted:
+                pass
+            runner.on_result = lambda result, summary: None
+            summary = asyncio.run(runner.run(rows, output))
+            answered = {json.loads(line)["row"] for line in output.read_text().splitlines()}
+            assert len(answered) == args.rows, "some rows have no result"
+            print(f"{concurrency:5d} {summary['rows_per_sec']:7.1f} {summary['latency_p50_ms']:8.1f} "
+                  f"{summary['latency_p95_ms']:8.1f} {summary['latency_p99_ms']:8.1f} {summary['retries']:8d} "
+                  f"{summary['failed']:7d} {summary['resumed']:8d} {stub.requests - before:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Upstream calls and latency of the Gemini proxy with and without its response cache.
+
+Replays deterministic requests drawn from a fixed set of prompts with a
+Zipf-like popularity (a few prompts asked over and over, a long tail asked
+once) through the proxy's /gemini/generate route, against gemini_stub.py
+started in-process. Reports how many requests reached the API, the hit
+rate, how many misses were coalesced onto an identical request already
+in flight, and latency on hits and misses, for one or more memory-tier
+sizes. 0 is the baseline: no cache and no coalescing, every request goes
+to the API.
+
+Usage::
+
+    python benchmarks/bench_gemini_cache.py --requests 1000 --prompts 200 --memory 0,16,512
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gemini_proxy import GeminiProxy, ResponseCache, cache_key
+from gemini_stub import start_stub
+
+
+def body(prompt):
+    return json.dumps({
+        "deterministic": True,
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": {"maxOutputTokens": 256},
+    }).encode("utf-8")
+
+
+def percentile(values, share):
+    return values[int(share * (len(values) - 1))] if values else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--memory", default="0,16,512",
+                        help="memory-tier sizes in entries; 0 disables the cache and coalescing")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100, help="stub delay per request")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    stub = start_stub(latency_ms=args.latency_ms, tokens=200)
+    base_url = f"http://127.0.0.1:{stub.server_port}/v1beta"
+    texts = [f"Explain topic number {index} in simple terms" for index in range(args.prompts)]
+    weights = [1 / (rank + 1) for rank in range(len(texts))]
+    workload = [body(text) for text in random.Random(args.seed).choices(texts, weights, k=args.requests)]
+
+    print(f"{args.requests} requests over {args.prompts} prompts, concurrency {args.concurrency}")
+    print(f"{'memory':>7} {'upstream':>9} {'hit rate':>9} {'coalesced':>10} {'hit p50':>9} {'miss p50':>9} "
+          f"{'p95':>8} {'total s':>8}")
+    for memory in map(int, args.memory.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(tmp, max_entries=memory) if memory else None
+            proxy = GeminiProxy(base_url, "stub", pool_size=args.concurrency, cache=cache)
+            before = stub.requests
+
+            def timed(request_body):
+                # handle_generate, split so a cache hit can be told apart.
+                start = time.perf_counter()
+                model, request, bypass = proxy.parse_request(request_body)
+                key, reply = proxy.lookup(model, request, bypass)
+                if cache is None:
+                    proxy.generate(model, request)
+                elif reply is None:
+                    proxy.generate_shared(model, request, key or cache_key(model, request), store=key is not None)
+                return reply is not None, (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(pool.map(timed, workload))
+            elapsed = time.perf_counter() - start
+            upstream = stub.requests - before
+            latencies = [ms for _, ms in results]
+            # A coalesced request is a miss: it waits for the one in flight.
+            hits = sorted(ms for hit, ms in results if hit)
+            misses = sorted(ms for hit, ms in results if not hit)
+            hit_rate = cache.stats()["hit_rate"] if cache else 0.0
+            print(f"{memory:7d} {upstream:9d} {hit_rate:9.1%} {proxy.coalesced:10d} "
+                  f"{statistics.median(hits) if hits else 0:7.2f}ms "
+                  f"{statistics.median(misses) if misses else 0:7.1f}ms {percentile(sorted(latencies), 0.95):6.1f}ms "
+                  f"{elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Upstream calls and latency saved by coalescing identical in-flight Gemini requests.
+
+Imitates a classroom: in each wave, every session sends the same sampled
+(uncacheable) prompt within a short window, and waves use different
+prompts. Requests go through the proxy's /gemini/generate route, which
+shares one upstream call among identical requests in flight, and for
+comparison straight to GeminiProxy.generate, which makes one call each.
+The target is gemini_stub.py started in-process.
+
+Usage::
+
+    python benchmarks/bench_gemini_coalesce.py --sessions 30 --waves 10 --spread-ms 300
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gemini_proxy import DEFAULT_MODEL, GeminiProxy
+from gemini_stub import start_stub
+
+
+def wave_requests(wave):
+    request = {"contents": [{"parts": [{"text": f"Explain exercise {wave} to the class"}]}],
+               "generationConfig": {"temperature": 0.9, "maxOutputTokens": 256}}
+    return request, json.dumps(request).encode("utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=30, help="sessions sending each prompt")
+    parser.add_argument("--waves", type=int, default=10, help="distinct prompts, sent one wave at a time")
+    parser.add_argument("--spread-ms", type=float, default=300, help="window in which a wave's requests start")
+    parser.add_argument("--latency-ms", type=float, default=1000, help="stub delay per request")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    stub = start_stub(latency_ms=args.latency_ms, tokens=200)
+    base_url = f"http://127.0.0.1:{stub.server_port}/v1beta"
+    print(f"{args.waves} waves of {args.sessions} sessions, spread over {args.spread_ms:g} ms, "
+          f"stub latency {args.latency_ms:g} ms")
+    print(f"{'mode':>10} {'upstream':>9} {'saved':>6} {'p50 ms':>8} {'p99 ms':>8} {'total s':>8}")
+    for mode in ("separate", "coalesced"):
+        proxy = GeminiProxy(base_url, "stub", pool_size=args.sessions)
+        rng = random.Random(args.seed)
+        before = stub.requests
+        latencies = []
+
+        def send(job):
+            delay, request, body = job
+            time.sleep(delay)
+            start = time.perf_counter()
+            if mode == "coalesced":
+                proxy.handle_generate(body, {}, {})
+            else:
+                proxy.generate(DEFAULT_MODEL, request)
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.sessions) as pool:
+            for wave in range(args.waves):
+                request, body = wave_requests(wave)
+                jobs = [(rng.uniform(0, args.spread_ms / 1000), request, body) for _ in range(args.sessions)]
+                latencies += pool.map(send, jobs)
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print(f"{mode:>10} {stub.requests - before:9d} {proxy.coalesced:6d} {statistics.median(latencies):8.1f} "
+              f"{latencies[int(0.99 * (len(latencies) - 1))]:8.1f} {elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
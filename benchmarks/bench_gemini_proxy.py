@@ -0,0 +1,95 @@
+"""Latency and throughput of the Gemini proxy, pooled against unpooled.
+
+Sends the same generateContent request through GeminiProxy (one shared,
+pooled requests.Session) and, for comparison, through a fresh connection
+per request, at several concurrency levels. By default the target is
+gemini_stub.py started in-process, which measures the proxy's own
+overhead and connection reuse; pass --base-url (and set GEMINI_API_KEY)
+to measure the real API, where each new connection also costs a TLS
+handshake.
+
+Usage::
+
+    python benchmarks/bench_gemini_proxy.py --requests 200 --concurrency 1,8,32
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+
+from gemini_proxy import DEFAULT_MODEL, GeminiProxy
+from gemini_stub import start_stub
+
+REQUEST = {
+    "contents": [{"parts": [{"text": "Explain quantum computing in simple terms"}]}],
+    "generationConfig": {"temperature": 0.9, "topK": 1, "topP": 1, "maxOutputTokens": 256},
+}
+
+
+def unpooled(base_url, key):
+    def send():
+        response = requests.post(f"{base_url}/models/{DEFAULT_MODEL}:generateContent", data=json.dumps(REQUEST),
+                                 headers={"x-goog-api-key": key, "Content-Type": "application/json",
+                                          "Connection": "close"}, timeout=(5, 120))
+        return response.status_code
+    return send
+
+
+def pooled(proxy):
+    def send():
+        return proxy.generate(DEFAULT_MODEL, REQUEST)[0]
+    return send
+
+
+def run(send, count, concurrency):
+    def timed(_):
+        start = time.perf_counter()
+        status = send()
+        return status, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(ms for _, ms in results)
+    errors = sum(status != 200 for status, _ in results)
+    return count / elapsed, statistics.median(latencies), latencies[int(0.95 * (count - 1))], errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--base-url", help="real API base URL instead of the in-process stub")
+    parser.add_argument("--latency-ms", type=float, default=50, help="stub delay per request")
+    args = parser.parse_args(argv)
+
+    stub = None
+    if args.base_url:
+        base_url, key = args.base_url.rstrip("/"), os.environ.get("GEMINI_API_KEY", "")
+    else:
+        stub = start_stub(latency_ms=args.latency_ms, tokens=200)
+        base_url, key = f"http://127.0.0.1:{stub.server_port}/v1beta", "stub"
+
+    print(f"{args.requests} requests to {base_url}")
+    print(f"{'mode':>9} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'connections':>12}")
+    for concurrency in map(int, args.concurrency.split(",")):
+        proxy = GeminiProxy(base_url, key, pool_size=concurrency)
+        proxy.generate(DEFAULT_MODEL, REQUEST)
+        for mode, send in (("unpooled", unpooled(base_url, key)), ("pooled", pooled(proxy))):
+            before = stub.connections if stub else 0
+            rate, p50, p95, errors = run(send, args.requests, concurrency)
+            connections = (stub.connections - before) if stub else (proxy.connections_opened() if mode == "pooled" else args.requests)
+            print(f"{mode:>9} {concurrency:5d} {rate:8.1f} {p50:8.1f} {p95:8.1f} {errors:7d} {connections:12d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Import-time budget and ``-X importtime`` profile for app.py.
+
+Imports the app in a fresh interpreter several times and keeps the fastest
+run, so the numbers reflect what a new worker pays on cold start.
+
+Usage::
+
+    python benchmarks/bench_imports.py                  # check the budget
+    python benchmarks/bench_imports.py --profile --top 30
+
+The run fails if importing ``app`` takes longer than ``--budget-ms`` or if
+any module listed in ``--forbid`` is imported at start-up; those are meant
+to be imported inside the code paths that use them.
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module="app"):
+    """Return ``{name: (self_us, cumulative_us, depth)}`` for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            profile[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return profile
+
+
+def best_of(runs, module="app"):
+    """Merge several profiles keeping the fastest timing for each module."""
+    best = {}
+    for _ in range(runs):
+        for name, timing in import_profile(module).items():
+            if name not in best or timing[1] < best[name][1]:
+                best[name] = timing
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=750.0)
+    parser.add_argument("--forbid", default="requests,PIL,numpy",
+                        help="comma-separated modules that must not load at start-up")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--profile", action="store_true", help="print the per-module breakdown")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    profile = best_of(args.runs)
+    total_ms = profile["app"][1] / 1000
+
+    if args.profile:
+        print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        ranked = sorted(profile.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (self_us, cumulative_us, depth) in ranked[:args.top]:
+            print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {'  ' * depth}{name}")
+        print()
+
+    failures = []
+    print(f"import app: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if total_ms > args.budget_ms:
+        failures.append(f"over budget by {total_ms - args.budget_ms:.1f} ms")
+    for name in filter(None, args.forbid.split(",")):
+        if name in profile:
+            failures.append(f"{name} is imported at start-up ({profile[name][1] / 1000:.1f} ms)")
+
+    for failure in failures:
+        print("FAIL: " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Throughput and per-frame latency of the server-side photo pipeline.
+
+Feeds synthetic camera frames straight into PhotoIngestor (no HTTP) and
+reports frames/s and latency percentiles for several worker counts.
+
+Usage::
+
+    python benchmarks/bench_photo_ingest.py --frames 200 --size 1280x720
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+
+from photo_ingest import PhotoIngestor
+
+
+def synthetic_frame(width, height, image_format):
+    """A noisy frame, so the encoder cannot shortcut flat areas."""
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def run(frames, data, workers):
+    ingestor = PhotoIngestor(workers=workers, queue_size=frames, max_backlog=frames)
+    start = time.perf_counter()
+    for _ in range(frames):
+        ingestor.submit(data, session="bench")
+    while ingestor.backlog:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    stats = ingestor.stats()
+    ingestor.shutdown()
+    return frames / elapsed, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--format", default="PNG", help="PIL format of the uploaded frames")
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args(argv)
+
+    width, height = map(int, args.size.split("x"))
+    data = synthetic_frame(width, height, args.format)
+    print(f"{args.frames} frames of {args.size} {args.format} ({len(data) / 1024:.0f} KB each)")
+    print(f"{'workers':>7} {'frames/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for workers in map(int, args.workers.split(",")):
+        throughput, stats = run(args.frames, data, workers)
+        print(f"{workers:7d} {throughput:9.1f} {stats['latency_p50_ms']:8.1f} {stats['latency_p95_ms']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Rerun-latency benchmark for every show_* demo.
+
+Drives app.py through each sidebar choice with Streamlit's AppTest and
+records, per demo:
+
+* ``cold_ms``  - median rerun into the demo with the demo-asset caches emptied
+* ``warm_ms``  - median rerun with everything cached
+* ``peak_kb``  - tracemalloc peak during a warm rerun
+* ``forward_msg_bytes`` - serialized size of the ForwardMsgs the rerun
+  queued for the browser
+
+Usage::
+
+    python benchmarks/bench_reruns.py --output rerun.json
+    python benchmarks/bench_reruns.py --baseline rerun.json --threshold 0.25
+
+With ``--baseline`` the run exits non-zero if any metric got worse than
+the baseline by more than the threshold (a fraction, 0.25 = 25%).
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+sys.path.insert(0, str(APP_PATH.parent))
+
+import assets
+
+DEMOS = [
+    ("📷 Media Capture", "show_media_capture"),
+    ("🎤 Speech & Audio", "show_speech_audio"),
+    ("🤖 AI Integration", "show_ai_integration"),
+    ("📱 Social Media", "show_social_media"),
+    ("🔍 Search & Scraping", "show_search_scraping"),
+    ("🖱️ Interactive Elements", "show_interactive_elements"),
+]
+
+METRICS = ["cold_ms", "warm_ms", "peak_kb", "forward_msg_bytes"]
+
+
+# The ForwardMsgs of the last AppTest run. AppTest only keeps the element
+# tree parsed from them, so the runner's queue is read as it is handed over.
+_last_forward_msgs = []
+_forward_msgs = LocalScriptRunner.forward_msgs
+
+
+def _recording_forward_msgs(runner):
+    messages = _forward_msgs(runner)
+    _last_forward_msgs[:] = messages
+    return messages
+
+
+LocalScriptRunner.forward_msgs = _recording_forward_msgs
+
+
+def forward_msg_bytes():
+    """Serialized size of the ForwardMsgs the last run queued, deltas and lifecycle messages alike."""
+    return sum(message.ByteSize() for message in _last_forward_msgs)
+
+
+def clear_asset_caches():
+    """Forget the built demo documents, so the next rerun builds them again.
+
+    Only these caches are cleared: the other resources hold thread and
+    process pools, sessions and queues, which ``st.cache_resource.clear()``
+    would drop without shutting them down.
+    """
+    for cached in (assets._load_runtime, assets._load_demo, assets._published_filename):
+        cached.clear()
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"app raised during benchmark: {at.exception[0].message}")
+    return elapsed
+
+
+def bench_demo(label, cold_runs, warm_runs):
+    at = AppTest.from_file(str(APP_PATH), default_timeout=60)
+    at.run()
+    at.sidebar.selectbox[0].select(label)
+
+    cold = []
+    for _ in range(cold_runs):
+        clear_asset_caches()
+        cold.append(timed_run(at))
+    payload = forward_msg_bytes()
+
+    warm = [timed_run(at) for _ in range(warm_runs)]
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    timed_run(at)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "cold_ms": round(statistics.median(cold), 2),
+        "warm_ms": round(statistics.median(warm), 2),
+        "peak_kb": round(peak / 1024, 1),
+        "forward_msg_bytes": payload,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=APP_PATH.parent, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human-readable regressions against ``baseline``."""
+    regressions = []
+    for demo, metrics in results["demos"].items():
+        before = baseline.get("demos", {}).get(demo)
+        if not before:
+            continue
+        for metric in METRICS:
+            old, new = before.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append(f"{demo}.{metric}: {old} -> {new} (+{change:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="rerun_bench.json", help="where to write results")
+    parser.add_argument("--baseline", help="results file from an earlier commit to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression as a fraction")
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument("--warm-runs", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+        "demos": {},
+    }
+    for label, func in DEMOS:
+        results["demos"][func] = bench_demo(label, args.cold_runs, args.warm_runs)
+        m = results["demos"][func]
+        print(f"{func:28} cold {m['cold_ms']:8.2f} ms  warm {m['warm_ms']:7.2f} ms  "
+              f"peak {m['peak_kb']:8.1f} KB  forward msgs {m['forward_msg_bytes']:7d} B")
+
+    Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"regressions against {baseline.get('revision', args.baseline)}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"no regressions above {args.threshold:.0%} against {baseline.get('revision', args.baseline)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Append and search cost of the transcript log as it grows.
+
+Fills a TranscriptStore with synthetic sessions of speech-like segments
+(Zipf-distributed words, as in real text) and reports, per step of
+growth, the cost of appending a segment and the latency of searching for
+common and rare words. Appending should stay flat as the log grows;
+search grows only with how often the rarest query word occurs, not with
+the size of the log. Ends with the time to rebuild the index from the
+log, as on start-up.
+
+Usage::
+
+    python benchmarks/bench_transcripts.py --segments 500000 --steps 5
+"""
+import argparse
+import itertools
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transcripts import TranscriptStore
+
+
+def vocabulary(size):
+    return [f"word{rank}" for rank in range(size)]
+
+
+def segments(rng, words, cum_weights, count):
+    return [{"text": " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(6, 18))),
+             "confidence": round(rng.uniform(0.6, 1.0), 3)} for _ in range(count)]
+
+
+def search_ms(store, queries):
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(0.95 * (len(times) - 1))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=200_000)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=5, help="segments per POST, as the demo batches them")
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.vocabulary)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    queries = ([f"word{rank}" for rank in range(5)] + [f"word{rank} word{rank + 1}" for rank in range(5)]
+               + [f"word{rank}" for rank in rng.sample(range(1000, len(words)), 20)])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TranscriptStore(tmp)
+        per_step = args.segments // args.steps
+        print(f"{'segments':>9} {'append µs/seg':>14} {'search p50 ms':>14} {'search p95 ms':>14}")
+        for step in range(args.steps):
+            batches = [segments(rng, words, cum_weights, args.batch) for _ in range(per_step // args.batch)]
+            start = time.perf_counter()
+            for index, batch in enumerate(batches):
+                store.append(f"session-{step}-{index // 500}", batch)
+            append_us = (time.perf_counter() - start) / per_step * 1e6
+            p50, p95 = search_ms(store, queries)
+            print(f"{store.stats()['segments']:9d} {append_us:14.1f} {p50:14.2f} {p95:14.2f}")
+
+        stats = store.stats()
+        start = time.perf_counter()
+        TranscriptStore(tmp)
+        print(f"reloaded {stats['segments']} segments ({stats['log_bytes'] / 1048576:.1f} MB, "
+              f"{stats['words']} words) in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
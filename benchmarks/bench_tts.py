@@ -0,0 +1,61 @@
+"""Hit rate and latency of the offline TTS cache under a kiosk workload.
+
+Replays requests drawn from a fixed set of prompts with a Zipf-like
+popularity (a few greetings dominate, a long tail is rare) against
+OfflineSpeech with the installed engine (espeak-ng or pyttsx3), for one
+or more cache sizes. Reports the hit rate, render latency on misses and
+serving latency on hits.
+
+Usage::
+
+    python benchmarks/bench_tts.py --requests 2000 --prompts 200 --cache-mb 1,8,64
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from offline_tts import OfflineSpeech, find_engine
+
+
+def prompts(count):
+    return [f"Prompt number {index}. Please touch the screen to continue, or ask a member of staff for help."
+            for index in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--cache-mb", default="1,8,64")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    engine, _ = find_engine()
+    if engine is None:
+        sys.exit("No offline speech engine found; install espeak-ng or pyttsx3.")
+    texts = prompts(args.prompts)
+    weights = [1 / (rank + 1) for rank in range(len(texts))]
+    workload = random.Random(args.seed).choices(texts, weights, k=args.requests)
+
+    print(f"{args.requests} requests over {args.prompts} prompts with {engine}")
+    print(f"{'cache MB':>8} {'hit rate':>9} {'render p50':>11} {'render p95':>11} {'hit p50':>9} {'evictions':>10} {'total s':>8}")
+    for cache_mb in map(float, args.cache_mb.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            speech = OfflineSpeech(tmp, max_bytes=int(cache_mb * 1048576))
+            start = time.perf_counter()
+            for text in workload:
+                speech.speak(text)
+            elapsed = time.perf_counter() - start
+            stats = speech.stats()
+            print(f"{cache_mb:8g} {stats['hit_rate']:9.1%} {stats.get('render_p50_ms', 0):9.1f}ms "
+                  f"{stats.get('render_p95_ms', 0):9.1f}ms {stats.get('hit_p50_ms', 0):7.2f}ms "
+                  f"{stats['evictions']:10d} {elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Frames/s and trimming of the voice-activity detector.
+
+Synthesizes 16 kHz audio with known utterances (voiced syllables on a
+harmonic series plus fricative hiss) separated by pauses in background
+noise, then feeds it to VoiceActivityDetector in chunks of several sizes,
+as the speech demo's AudioWorklet would. Reports frames/s, how many
+utterances were found against how many were generated, and the share of
+audio trimmed against the share that really was silence.
+
+Usage::
+
+    python benchmarks/bench_vad.py --minutes 10 --chunks 100,1000,10000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from voice_activity import FRAME_MS, SAMPLE_RATE, VoiceActivityDetector
+
+
+def dbfs(level_db):
+    return 32768 * 10 ** (level_db / 20)
+
+
+def utterance(rng, seconds):
+    """Syllables of a voiced tone at ~-20 dBFS, some followed by a short hiss."""
+    parts = []
+    while sum(map(len, parts)) < seconds * SAMPLE_RATE:
+        length = int(rng.uniform(0.12, 0.3) * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        f0 = rng.uniform(100, 220)
+        tone = sum(np.sin(2 * np.pi * f0 * harmonic * t) / harmonic for harmonic in range(1, 6))
+        parts.append(tone * np.hanning(length) * dbfs(-20) / 1.5)
+        if rng.random() < 0.3:
+            hiss = int(0.08 * SAMPLE_RATE)
+            parts.append(rng.normal(0, dbfs(-38), hiss) * np.hanning(hiss))
+    return np.concatenate(parts)
+
+
+def synthetic_session(minutes, noise_db=-60, seed=1):
+    """Return ``(samples, utterance count, silent share)``."""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    signal = rng.normal(0, dbfs(noise_db), total)
+    position, count, voiced = int(rng.uniform(1, 2) * SAMPLE_RATE), 0, 0
+    while True:
+        speech = utterance(rng, rng.uniform(1, 4))
+        if position + len(speech) > total:
+            break
+        signal[position:position + len(speech)] += speech
+        position += len(speech) + int(rng.uniform(0.8, 3) * SAMPLE_RATE)
+        voiced += len(speech)
+        count += 1
+    return np.clip(signal, -32768, 32767).astype("<i2"), count, 1 - voiced / total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--chunks", default="100,1000,10000", help="chunk sizes in ms")
+    parser.add_argument("--noise-db", type=float, default=-60)
+    args = parser.parse_args(argv)
+
+    samples, utterances, silent = synthetic_session(args.minutes, args.noise_db)
+    frames = len(samples) * 1000 // SAMPLE_RATE // FRAME_MS
+    print(f"{args.minutes:g} min at {SAMPLE_RATE} Hz ({frames} frames of {FRAME_MS} ms), "
+          f"{utterances} utterances, {silent:.1%} silence")
+    print(f"{'chunk ms':>8} {'frames/s':>10} {'x realtime':>10} {'utterances':>10} {'trimmed':>8}")
+    data = samples.tobytes()
+    for chunk_ms in map(int, args.chunks.split(",")):
+        step = SAMPLE_RATE * chunk_ms // 1000 * 2
+        detector = VoiceActivityDetector()
+        found = 0
+        start = time.perf_counter()
+        for offset in range(0, len(data), step):
+            found += len(detector.process(data[offset:offset + step]))
+        found += detector.flush() is not None
+        elapsed = time.perf_counter() - start
+        print(f"{chunk_ms:8d} {detector.frames / elapsed:10.0f} {detector.frames * FRAME_MS / 1000 / elapsed:10.0f} "
+              f"{found:10d} {detector.trimmed_ratio:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
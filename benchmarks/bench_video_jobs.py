@@ -0,0 +1,104 @@
+"""Throughput of the recording post-processing pool.
+
+Writes synthetic WebM recordings shaped like MediaRecorder output (unknown
+sized Segment and Clusters, a keyframe per cluster) and pushes them through
+VideoJobQueue with several worker counts. Without ffmpeg on the PATH only
+the container parsing runs; with it, keyframes are decoded as well.
+
+Usage::
+
+    python benchmarks/bench_video_jobs.py --recordings 16 --seconds 60
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from video_jobs import VideoJobQueue
+
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def _size(value):
+    return (value | 1 << 56).to_bytes(8, "big")
+
+
+def _element(element_id, payload):
+    return element_id + _size(len(payload)) + payload
+
+
+def _uint(element_id, value):
+    return _element(element_id, value.to_bytes(4, "big"))
+
+
+def synthetic_webm(seconds, fps=30, frame_bytes=4000):
+    """A video+audio WebM with one cluster, starting on a keyframe, per second."""
+    tracks = (
+        _element(b"\xae", _uint(b"\xd7", 1) + _uint(b"\x83", 1) + _element(b"\x86", b"V_VP8")
+                 + _element(b"\xe0", _uint(b"\xb0", 1280) + _uint(b"\xba", 720)))
+        + _element(b"\xae", _uint(b"\xd7", 2) + _uint(b"\x83", 2) + _element(b"\x86", b"A_OPUS"))
+    )
+    parts = [
+        _element(b"\x1a\x45\xdf\xa3", _element(b"\x42\x82", b"webm")),
+        b"\x18\x53\x80\x67" + UNKNOWN_SIZE,
+        _element(b"\x15\x49\xa9\x66", _uint(b"\x2a\xd7\xb1", 1_000_000)),
+        _element(b"\x16\x54\xae\x6b", tracks),
+    ]
+    for second in range(seconds):
+        parts.append(b"\x1f\x43\xb6\x75" + UNKNOWN_SIZE + _uint(b"\xe7", second * 1000))
+        for frame in range(fps):
+            relative = int(frame * 1000 / fps).to_bytes(2, "big")
+            flags = b"\x80" if frame == 0 else b"\x00"
+            parts.append(_element(b"\xa3", b"\x81" + relative + flags + os.urandom(frame_bytes)))
+            parts.append(_element(b"\xa3", b"\x82" + relative + b"\x80" + os.urandom(160)))
+    return b"".join(parts)
+
+
+def run(paths, workers, out_dir):
+    queue = VideoJobQueue(out_dir=out_dir, workers=workers, max_pending=len(paths))
+    # Start the worker processes before timing, as a long-running app would have.
+    queue.submit(paths[0]).future.result()
+    start = time.perf_counter()
+    jobs = [queue.submit(path) for path in paths]
+    for job in jobs:
+        job.future.exception()
+    while any(job.finished_at is None for job in jobs):
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    stats = queue.stats()
+    queue.shutdown()
+    return len(paths) / elapsed, stats, jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recordings", type=int, default=8)
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count()}")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = synthetic_webm(args.seconds)
+        paths = []
+        for index in range(args.recordings):
+            path = Path(tmp) / f"bench-{index}.webm"
+            path.write_bytes(data)
+            paths.append(path)
+        print(f"{args.recordings} recordings of {args.seconds} s ({len(data) / 1048576:.1f} MB each), "
+              f"{os.cpu_count()} cores")
+        print(f"{'workers':>7} {'jobs/s':>8} {'p50 ms':>8} {'p95 ms':>8}  result")
+        for workers in sorted(set(map(int, args.workers.split(",")))):
+            throughput, stats, jobs = run(paths, workers, tmp)
+            result = jobs[0].result or {"error": jobs[0].error}
+            summary = (f"{result.get('duration_s')} s, {result.get('keyframes')} keyframes"
+                       if jobs[0].result else result["error"])
+            print(f"{workers:7d} {throughput:8.1f} {stats.get('run_p50_ms', 0):8.1f} "
+                  f"{stats.get('run_p95_ms', 0):8.1f}  {summary}")
+
+
+if __name__ == "__main__":
+    main()
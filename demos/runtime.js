@@ -0,0 +1,1145 @@
+// Shared helpers for the demo documents. The build step only ships the
+// functions a demo actually references, so keep one top-level function
+// per helper.
+
+const STATUS_COLORS = {
+    idle: '#f0f0f0',
+    success: '#d4edda',
+    info: '#d1ecf1',
+    warning: '#fff3cd',
+    error: '#f8d7da'
+};
+
+function setStatus(element, message, tone) {
+    if (typeof element === 'string') {
+        element = document.getElementById(element);
+    }
+    element.innerHTML = message;
+    element.style.background = STATUS_COLORS[tone || 'idle'];
+}
+
+function createSpeechRecognition(options) {
+    const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
+    if (!SpeechRecognition) {
+        return null;
+    }
+    const recognition = new SpeechRecognition();
+    Object.assign(recognition, options || {});
+    return recognition;
+}
+
+// Streamlit component bridge. When a demo is served as a declared
+// component, events it emits are queued and sent back to Python in
+// batches: a burst of events within BRIDGE.debounceMs (or at most
+// BRIDGE.maxWaitMs apart) causes a single rerun. Events stay queued until
+// Python acknowledges them through the "ack" render argument, so a batch
+// that is overwritten before the script reruns is resent with the next one.
+const BRIDGE = {
+    session: Math.random().toString(36).slice(2),
+    nextId: 1,
+    pending: [],
+    args: {},
+    timer: null,
+    firstQueuedAt: 0,
+    debounceMs: 200,
+    maxWaitMs: 1000,
+    sized: false
+};
+
+function postToStreamlit(type, data) {
+    window.parent.postMessage(Object.assign({ isStreamlitMessage: true, type: type }, data), '*');
+}
+
+function connectStreamlit() {
+    window.addEventListener('message', handleStreamlitRender);
+    window.addEventListener('pagehide', flushToStreamlit);
+    postToStreamlit('streamlit:componentReady', { apiVersion: 1 });
+}
+
+function handleStreamlitRender(event) {
+    if (!event.data || event.data.type !== 'streamlit:render') {
+        return;
+    }
+    const args = event.data.args || {};
+    BRIDGE.args = args;
+    BRIDGE.debounceMs = args.debounce_ms || BRIDGE.debounceMs;
+    if (args.ack_session === BRIDGE.session) {
+        BRIDGE.pending = BRIDGE.pending.filter(item => item.id > args.ack);
+    }
+    if (!BRIDGE.sized && args.height) {
+        BRIDGE.sized = true;
+        if (args.scrolling) {
+            document.documentElement.style.cssText = 'height: 100%; overflow: hidden;';
+            document.body.style.cssText = 'height: 100%; margin: 0; overflow-y: auto;';
+        }
+        postToStreamlit('streamlit:setFrameHeight', { height: args.height });
+    }
+}
+
+function emitToStreamlit(type, payload) {
+    BRIDGE.pending.push({ id: BRIDGE.nextId++, type: type, payload: payload, time: Date.now() });
+    const now = Date.now();
+    if (!BRIDGE.firstQueuedAt) {
+        BRIDGE.firstQueuedAt = now;
+    }
+    clearTimeout(BRIDGE.timer);
+    const wait = Math.min(BRIDGE.debounceMs, BRIDGE.firstQueuedAt + BRIDGE.maxWaitMs - now);
+    BRIDGE.timer = setTimeout(flushToStreamlit, Math.max(wait, 0));
+}
+
+function flushToStreamlit() {
+    clearTimeout(BRIDGE.timer);
+    BRIDGE.timer = null;
+    BRIDGE.firstQueuedAt = 0;
+    if (BRIDGE.pending.length === 0) {
+        return;
+    }
+    postToStreamlit('streamlit:setComponentValue', {
+        value: { session: BRIDGE.session, events: BRIDGE.pending },
+        dataType: 'json'
+    });
+}
+
+// `path` on the asset server with the token the app handed this page. The
+// server refuses state-changing routes without it; it goes in the query
+// string because beacons and media elements cannot set headers.
+function serverUrl(path) {
+    const token = encodeURIComponent(BRIDGE.args.demo_token || '');
+    return `${path}${path.includes('?') ? '&' : '?'}token=${token}`;
+}
+
+// POST binary data to one of the asset server's endpoints. Only works when
+// the demo is served from the asset server; inline documents resolve to null.
+async function uploadToServer(path, body, headers) {
+    if (location.protocol !== 'http:' && location.protocol !== 'https:') {
+        return null;
+    }
+    const response = await fetch(serverUrl(path), {
+        method: 'POST',
+        body: body,
+        headers: Object.assign({ 'X-Demo-Session': BRIDGE.session }, headers || {})
+    });
+    if (!response.ok) {
+        throw new Error('Upload failed: ' + response.status);
+    }
+    return response.json();
+}
+
+// Read a text/event-stream response body, calling onEvent(type, data) for
+// each event as it arrives. `data` is parsed as JSON; `type` is 'message'
+// unless the event names one. Resolves when the stream ends and rejects
+// with an AbortError when the fetch is aborted.
+async function readServerEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+        const { value, done } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const blocks = buffer.split(/\r?\n\r?\n/);
+        buffer = done ? '' : blocks.pop();
+        for (const block of blocks) {
+            let type = 'message';
+            const data = [];
+            for (const line of block.split(/\r?\n/)) {
+                if (line.startsWith('event:')) {
+                    type = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data.push(line.slice(5).trimStart());
+                }
+            }
+            if (data.length) {
+                onEvent(type, JSON.parse(data.join('\n')));
+            }
+        }
+        if (done) {
+            return;
+        }
+    }
+}
+
+// Frame encoding. Where OffscreenCanvas is available the frame is copied
+// into an ImageBitmap (scaled on the way) and encoded in a worker, so a
+// large PNG or WebP encode never blocks the page; otherwise it falls back
+// to canvas.toBlob on the main thread.
+const ENCODER_SOURCE = `
+self.onmessage = async (event) => {
+    const { id, bitmap, type, quality } = event.data;
+    try {
+        const canvas = new OffscreenCanvas(bitmap.width, bitmap.height);
+        canvas.getContext('2d').drawImage(bitmap, 0, 0);
+        bitmap.close();
+        const blob = await canvas.convertToBlob({ type: type, quality: quality });
+        self.postMessage({ id: id, blob: blob });
+    } catch (error) {
+        self.postMessage({ id: id, error: error.message });
+    }
+};
+`;
+
+const ENCODER = { worker: null, nextId: 1, pending: new Map() };
+
+function getEncoderWorker() {
+    if (!ENCODER.worker && typeof OffscreenCanvas !== 'undefined' && typeof Worker !== 'undefined') {
+        const url = URL.createObjectURL(new Blob([ENCODER_SOURCE], { type: 'text/javascript' }));
+        ENCODER.worker = new Worker(url);
+        ENCODER.worker.onmessage = (event) => {
+            const job = ENCODER.pending.get(event.data.id);
+            ENCODER.pending.delete(event.data.id);
+            if (event.data.error) {
+                job.reject(new Error(event.data.error));
+            } else {
+                job.resolve(event.data.blob);
+            }
+        };
+    }
+    return ENCODER.worker;
+}
+
+function scaledSize(width, height, maxDimension) {
+    const scale = maxDimension ? Math.min(1, maxDimension / Math.max(width, height)) : 1;
+    return { width: Math.round(width * scale), height: Math.round(height * scale) };
+}
+
+async function encodeFrame(source, options) {
+    const opts = Object.assign({ type: 'image/jpeg', quality: 0.85, maxDimension: 0 }, options || {});
+    const size = scaledSize(source.videoWidth || source.width, source.videoHeight || source.height, opts.maxDimension);
+    const started = performance.now();
+    const worker = getEncoderWorker();
+    let blob;
+    if (worker && typeof createImageBitmap !== 'undefined') {
+        const bitmap = await createImageBitmap(source, {
+            resizeWidth: size.width,
+            resizeHeight: size.height,
+            resizeQuality: 'high'
+        });
+        blob = await new Promise((resolve, reject) => {
+            const id = ENCODER.nextId++;
+            ENCODER.pending.set(id, { resolve: resolve, reject: reject });
+            worker.postMessage({ id: id, bitmap: bitmap, type: opts.type, quality: opts.quality }, [bitmap]);
+        });
+    } else {
+        const canvas = document.createElement('canvas');
+        canvas.width = size.width;
+        canvas.height = size.height;
+        canvas.getContext('2d').drawImage(source, 0, 0, size.width, size.height);
+        blob = await new Promise((resolve, reject) => {
+            canvas.toBlob(result => result ? resolve(result) : reject(new Error('Encoding failed')), opts.type, opts.quality);
+        });
+    }
+    return { blob: blob, width: size.width, height: size.height, ms: performance.now() - started };
+}
+
+// Fixed-size ring of ImageBitmaps for burst capture. When the ring is
+// full the oldest frame is closed and counted as dropped, so memory stays
+// at `capacity` frames however long the burst runs.
+class FrameRing {
+    constructor(capacity) {
+        this.capacity = capacity;
+        this.slots = new Array(capacity).fill(null);
+        this.head = 0;
+        this.length = 0;
+        this.captured = 0;
+        this.dropped = 0;
+    }
+
+    push(frame) {
+        if (this.length === this.capacity) {
+            this.slots[this.head].close();
+            this.slots[this.head] = null;
+            this.head = (this.head + 1) % this.capacity;
+            this.length--;
+            this.dropped++;
+        }
+        this.slots[(this.head + this.length) % this.capacity] = frame;
+        this.length++;
+        this.captured++;
+    }
+
+    shift() {
+        if (!this.length) {
+            return null;
+        }
+        const frame = this.slots[this.head];
+        this.slots[this.head] = null;
+        this.head = (this.head + 1) % this.capacity;
+        this.length--;
+        return frame;
+    }
+
+    clear() {
+        let frame;
+        while ((frame = this.shift())) {
+            frame.close();
+        }
+    }
+}
+
+// Calls `onFrame(bitmap)` at up to `fps` frames per second until the
+// returned stop function is called. Uses requestVideoFrameCallback so
+// frames are only grabbed when the video has a new one, then
+// ImageCapture.grabFrame, then a plain timer.
+function startFrameGrabber(video, fps, onFrame) {
+    const interval = 1000 / fps;
+    let running = true;
+    let due = 0;
+    const stop = () => { running = false; };
+    // A grab still in flight when the grabber stops is discarded.
+    const deliver = (bitmap) => running ? onFrame(bitmap) : bitmap.close();
+
+    if ('requestVideoFrameCallback' in HTMLVideoElement.prototype) {
+        const tick = (now) => {
+            if (!running) {
+                return;
+            }
+            if (now >= due) {
+                due = Math.max(due + interval, now);
+                createImageBitmap(video).then(deliver, () => {});
+            }
+            video.requestVideoFrameCallback(tick);
+        };
+        video.requestVideoFrameCallback(tick);
+        return stop;
+    }
+
+    const track = video.srcObject && video.srcObject.getVideoTracks()[0];
+    const grab = (typeof ImageCapture !== 'undefined' && track)
+        ? (() => { const capture = new ImageCapture(track); return () => capture.grabFrame(); })()
+        : () => createImageBitmap(video);
+    const timer = setInterval(() => {
+        if (running) {
+            grab().then(deliver, () => {});
+        }
+    }, interval);
+    return () => { running = false; clearInterval(timer); };
+}
+
+// Streams a growing file (e.g. MediaRecorder chunks) to an asset-server
+// endpoint in order, one request at a time. Every chunk is sent with the
+// offset it starts at; when the server reports a different offset (a
+// retried chunk that had already landed, or one that only partly did),
+// the uploader skips what the server already has. 503s and network errors
+// are retried with backoff; any other failure is passed to `onError` and
+// ends the upload. `onPressure(true)` fires once more than
+// `highWaterBytes` are queued and `onPressure(false)` once the queue has
+// drained below `lowWaterBytes`, so the producer can pause.
+class ChunkUploader {
+    constructor(path, id, options) {
+        Object.assign(this, {
+            path: path,
+            id: id,
+            highWaterBytes: 8 * 1024 * 1024,
+            lowWaterBytes: 2 * 1024 * 1024,
+            onPressure: () => {},
+            onReply: () => {},
+            onError: () => {}
+        }, options || {});
+        this.queue = [];
+        this.queuedBytes = 0;
+        this.peakQueuedBytes = 0;
+        this.offset = 0;
+        this.sentBytes = 0;
+        this.retries = 0;
+        this.pressured = false;
+        this.sending = null;
+        this.error = null;
+        this.ended = false;
+    }
+
+    push(blob) {
+        this.queue.push(blob);
+        this.queuedBytes += blob.size;
+        this.peakQueuedBytes = Math.max(this.peakQueuedBytes, this.queuedBytes);
+        if (!this.pressured && this.queuedBytes > this.highWaterBytes) {
+            this.pressured = true;
+            this.onPressure(true);
+        }
+        if (!this.sending && !this.error) {
+            this.sending = this.pump()
+                .catch(error => {
+                    this.error = error;
+                    this.queue = [];
+                    this.queuedBytes = 0;
+                    this.onError(error);
+                })
+                .finally(() => { this.sending = null; });
+        }
+    }
+
+    async pump() {
+        let delay = 250;
+        while (this.queue.length) {
+            let response;
+            try {
+                response = await fetch(serverUrl(`${this.path}?id=${this.id}&offset=${this.offset}`), {
+                    method: 'POST',
+                    body: this.queue[0],
+                    headers: { 'X-Demo-Session': BRIDGE.session }
+                });
+            } catch (error) {
+                response = null;
+            }
+            if (response && (response.ok || response.status === 409)) {
+                const reply = await response.json();
+                let skip = reply.offset - this.offset;
+                if (skip < 0 || (response.status === 409 && (reply.error !== 'offset mismatch' || skip === 0))) {
+                    throw new Error('Upload cannot resume: ' + reply.error);
+                }
+                this.offset = reply.offset;
+                this.sentBytes += skip;
+                if (response.ok) {
+                    this.onReply(reply);
+                }
+                // Drop whatever the server already has, including a retried
+                // chunk that landed before its reply was lost.
+                while (skip > 0 && this.queue.length) {
+                    const head = this.queue[0];
+                    const taken = Math.min(skip, head.size);
+                    this.queuedBytes -= taken;
+                    skip -= taken;
+                    if (taken === head.size) {
+                        this.queue.shift();
+                    } else {
+                        this.queue[0] = head.slice(taken);
+                    }
+                }
+                delay = 250;
+            } else if (response && response.status !== 503) {
+                throw new Error('Upload failed: ' + response.status);
+            } else {
+                this.retries++;
+                const reply = response ? await response.json().catch(() => ({})) : {};
+                await new Promise(resolve => setTimeout(resolve, reply.retry_after_ms || delay));
+                delay = Math.min(delay * 2, 5000);
+            }
+            if (this.pressured && this.queuedBytes < this.lowWaterBytes) {
+                this.pressured = false;
+                this.onPressure(false);
+            }
+        }
+    }
+
+    async finish() {
+        while (this.sending) {
+            await this.sending;
+        }
+        if (this.error) {
+            throw this.error;
+        }
+        this.ended = true;
+        const response = await fetch(serverUrl(`${this.path}/finish?id=${this.id}`), { method: 'POST' });
+        if (!response.ok) {
+            throw new Error('Finishing upload failed: ' + response.status);
+        }
+        return response.json();
+    }
+
+    // For pagehide: tell the server in a beacon that nothing more is coming,
+    // so the upload does not hold a server slot until it times out. `action`
+    // is 'finish' to keep what arrived or 'abort' to discard it. Chunks still
+    // queued are lost; a beacon is too small to carry them.
+    end(action) {
+        if (!this.ended) {
+            this.ended = true;
+            navigator.sendBeacon(serverUrl(`${this.path}/${action}?id=${this.id}`));
+        }
+    }
+}
+
+// Capture profiles, best first. Auto mode steps down this list when the
+// camera drops frames or the encoder falls behind.
+const CAPTURE_PROFILES = [
+    { name: '1080p30', width: 1920, height: 1080, frameRate: 30, videoBitsPerSecond: 6000000 },
+    { name: '720p30', width: 1280, height: 720, frameRate: 30, videoBitsPerSecond: 2500000 },
+    { name: '480p30', width: 854, height: 480, frameRate: 30, videoBitsPerSecond: 1000000 },
+    { name: '360p15', width: 640, height: 360, frameRate: 15, videoBitsPerSecond: 400000 }
+];
+
+function videoConstraints(profile) {
+    return {
+        width: { ideal: profile.width },
+        height: { ideal: profile.height },
+        frameRate: { ideal: profile.frameRate, max: profile.frameRate }
+    };
+}
+
+const RECORDER_CODECS = [
+    { name: 'VP9', mimeType: 'video/webm;codecs=vp9,opus' },
+    { name: 'VP8', mimeType: 'video/webm;codecs=vp8,opus' },
+    { name: 'AV1', mimeType: 'video/webm;codecs=av01,opus' },
+    { name: 'H.264', mimeType: 'video/webm;codecs=h264,opus' },
+    { name: 'H.264 (MP4)', mimeType: 'video/mp4;codecs=avc1.42E01E,mp4a.40.2' }
+];
+
+function supportedRecorderCodecs() {
+    if (typeof MediaRecorder === 'undefined') {
+        return [];
+    }
+    return RECORDER_CODECS.filter(codec => MediaRecorder.isTypeSupported(codec.mimeType));
+}
+
+// Frame filters, run in a worker. Each filter takes and returns
+// { width, height, channels, data } with channels 3 (RGB) or 1 (gray) and
+// integer-only arithmetic, matching filters.py byte for byte so frames can
+// be checked against the server. The worker is built from this function's
+// source, so everything it uses must live inside it.
+function filterWorkerMain() {
+    const BLUR_TAPS = [1, 4, 6, 4, 1];
+
+    function resize(frame, maxDimension) {
+        const factor = Math.max(1, Math.ceil(Math.max(frame.width, frame.height) / (maxDimension || 320)));
+        if (factor === 1) {
+            return frame;
+        }
+        const { width, height, channels, data } = frame;
+        const outW = Math.floor(width / factor);
+        const outH = Math.floor(height / factor);
+        const area = factor * factor;
+        const out = new Uint8Array(outW * outH * channels);
+        const sums = new Uint32Array(outW * channels);
+        for (let oy = 0; oy < outH; oy++) {
+            sums.fill(0);
+            for (let y = oy * factor; y < (oy + 1) * factor; y++) {
+                const row = y * width * channels;
+                for (let x = 0; x < outW * factor; x++) {
+                    const target = Math.floor(x / factor) * channels;
+                    for (let c = 0; c < channels; c++) {
+                        sums[target + c] += data[row + x * channels + c];
+                    }
+                }
+            }
+            for (let i = 0; i < sums.length; i++) {
+                out[oy * outW * channels + i] = Math.floor((sums[i] + (area >> 1)) / area);
+            }
+        }
+        return { width: outW, height: outH, channels: channels, data: out };
+    }
+
+    function grayscale(frame) {
+        if (frame.channels === 1) {
+            return frame;
+        }
+        const { width, height, data } = frame;
+        const out = new Uint8Array(width * height);
+        for (let i = 0, j = 0; i < out.length; i++, j += 3) {
+            out[i] = Math.floor((299 * data[j] + 587 * data[j + 1] + 114 * data[j + 2] + 500) / 1000);
+        }
+        return { width: width, height: height, channels: 1, data: out };
+    }
+
+    function blur(frame) {
+        const { width, height, channels, data } = frame;
+        const rows = new Int32Array(data.length);
+        const out = new Uint8Array(data.length);
+        for (let y = 0; y < height; y++) {
+            for (let x = 0; x < width; x++) {
+                for (let c = 0; c < channels; c++) {
+                    let sum = 0;
+                    for (let k = 0; k < 5; k++) {
+                        const sx = Math.min(width - 1, Math.max(0, x + k - 2));
+                        sum += BLUR_TAPS[k] * data[(y * width + sx) * channels + c];
+                    }
+                    rows[(y * width + x) * channels + c] = sum;
+                }
+            }
+        }
+        for (let y = 0; y < height; y++) {
+            for (let x = 0; x < width; x++) {
+                for (let c = 0; c < channels; c++) {
+                    let sum = 0;
+                    for (let k = 0; k < 5; k++) {
+                        const sy = Math.min(height - 1, Math.max(0, y + k - 2));
+                        sum += BLUR_TAPS[k] * rows[(sy * width + x) * channels + c];
+                    }
+                    out[(y * width + x) * channels + c] = (sum + 128) >> 8;
+                }
+            }
+        }
+        return { width: width, height: height, channels: channels, data: out };
+    }
+
+    function edge(frame) {
+        const { width, height, data } = grayscale(frame);
+        const out = new Uint8Array(width * height);
+        const at = (x, y) => data[Math.min(height - 1, Math.max(0, y)) * width + Math.min(width - 1, Math.max(0, x))];
+        for (let y = 0; y < height; y++) {
+            for (let x = 0; x < width; x++) {
+                const gx = (at(x + 1, y - 1) + 2 * at(x + 1, y) + at(x + 1, y + 1)) -
+                           (at(x - 1, y - 1) + 2 * at(x - 1, y) + at(x - 1, y + 1));
+                const gy = (at(x - 1, y + 1) + 2 * at(x, y + 1) + at(x + 1, y + 1)) -
+                           (at(x - 1, y - 1) + 2 * at(x, y - 1) + at(x + 1, y - 1));
+                out[y * width + x] = Math.min(255, (Math.abs(gx) + Math.abs(gy)) >> 1);
+            }
+        }
+        return { width: width, height: height, channels: 1, data: out };
+    }
+
+    function histogram(frame) {
+        const counts = new Uint32Array(frame.channels * 256);
+        for (let i = 0; i < frame.data.length; i++) {
+            counts[(i % frame.channels) * 256 + frame.data[i]]++;
+        }
+        return counts;
+    }
+
+    const CRC_TABLE = new Uint32Array(256).map((_, n) => {
+        let c = n;
+        for (let k = 0; k < 8; k++) {
+            c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+        }
+        return c;
+    });
+
+    function crc32(bytes) {
+        let crc = 0xFFFFFFFF;
+        for (let i = 0; i < bytes.length; i++) {
+            crc = CRC_TABLE[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+        }
+        return (crc ^ 0xFFFFFFFF) >>> 0;
+    }
+
+    const FILTERS = { resize: resize, grayscale: grayscale, blur: blur, edge: edge };
+
+    function runPipeline(frame, spec) {
+        const measurements = {};
+        for (const step of spec.split(',').map(part => part.trim()).filter(Boolean)) {
+            const [name, arg] = step.split(':');
+            if (name === 'histogram') {
+                measurements.histogram = histogram(frame);
+            } else if (FILTERS[name]) {
+                frame = FILTERS[name](frame, arg ? parseInt(arg, 10) : undefined);
+            } else {
+                throw new Error('Unknown filter: ' + name);
+            }
+        }
+        return { frame: frame, measurements: measurements };
+    }
+
+    self.onmessage = async (event) => {
+        const { id, bitmap, spec, keepInput } = event.data;
+        try {
+            const canvas = new OffscreenCanvas(bitmap.width, bitmap.height);
+            const ctx = canvas.getContext('2d');
+            ctx.drawImage(bitmap, 0, 0);
+            bitmap.close();
+            const rgba = ctx.getImageData(0, 0, canvas.width, canvas.height);
+            const started = performance.now();
+            const rgb = new Uint8Array(rgba.width * rgba.height * 3);
+            for (let i = 0, j = 0; j < rgb.length; i += 4, j += 3) {
+                rgb[j] = rgba.data[i];
+                rgb[j + 1] = rgba.data[i + 1];
+                rgb[j + 2] = rgba.data[i + 2];
+            }
+            const result = runPipeline({ width: rgba.width, height: rgba.height, channels: 3, data: rgb }, spec);
+            const ms = performance.now() - started;
+
+            const frame = result.frame;
+            const display = new ImageData(frame.width, frame.height);
+            for (let i = 0; i < frame.width * frame.height; i++) {
+                for (let c = 0; c < 3; c++) {
+                    display.data[i * 4 + c] = frame.data[i * frame.channels + (frame.channels === 1 ? 0 : c)];
+                }
+                display.data[i * 4 + 3] = 255;
+            }
+            const output = await createImageBitmap(display);
+            const histogramCounts = result.measurements.histogram;
+            const reply = {
+                id: id,
+                output: output,
+                width: frame.width,
+                height: frame.height,
+                channels: frame.channels,
+                ms: ms,
+                crc32: crc32(frame.data),
+                histogram: histogramCounts || null,
+                histogramCrc32: histogramCounts ? crc32(new Uint8Array(histogramCounts.buffer)) : null,
+                input: keepInput ? rgba.data.buffer : null,
+                inputWidth: rgba.width,
+                inputHeight: rgba.height
+            };
+            const transfer = [output].concat(keepInput ? [rgba.data.buffer] : []);
+            self.postMessage(reply, transfer);
+        } catch (error) {
+            self.postMessage({ id: id, error: error.message });
+        }
+    };
+}
+
+const FILTER_WORKER = { worker: null, nextId: 1, pending: new Map() };
+
+function runFilters(bitmap, spec, keepInput) {
+    if (!FILTER_WORKER.worker) {
+        const url = URL.createObjectURL(new Blob([`(${filterWorkerMain})()`], { type: 'text/javascript' }));
+        FILTER_WORKER.worker = new Worker(url);
+        FILTER_WORKER.worker.onmessage = (event) => {
+            const job = FILTER_WORKER.pending.get(event.data.id);
+            FILTER_WORKER.pending.delete(event.data.id);
+            if (event.data.error) {
+                job.reject(new Error(event.data.error));
+            } else {
+                job.resolve(event.data);
+            }
+        };
+    }
+    return new Promise((resolve, reject) => {
+        const id = FILTER_WORKER.nextId++;
+        FILTER_WORKER.pending.set(id, { resolve: resolve, reject: reject });
+        FILTER_WORKER.worker.postMessage({ id: id, bitmap: bitmap, spec: spec, keepInput: !!keepInput }, [bitmap]);
+    });
+}
+
+// IndexedDB, promisified. `upgrade(db)` creates the object stores when
+// the database is new or `version` went up.
+function openDatabase(name, version, upgrade) {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(name, version);
+        request.onupgradeneeded = () => upgrade(request.result);
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function idbTransactionDone(transaction) {
+    return new Promise((resolve, reject) => {
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+        transaction.onabort = () => reject(transaction.error);
+    });
+}
+
+// Append-only transcript view. Segments go into a plain array and are
+// rendered in one batch per animation frame, so an append costs the same
+// however long the transcript is. The DOM is split into pages of
+// `pageSize` segments; full pages that scroll well out of view are
+// replaced by an empty box of the same height and rebuilt when they come
+// back, so only the pages near the viewport hold any nodes.
+class TranscriptView {
+    constructor(container, options) {
+        Object.assign(this, { pageSize: 50, onFlush: () => {} }, options || {});
+        this.container = container;
+        this.observer = new IntersectionObserver(
+            entries => entries.forEach(entry => this.toggle(entry.target, entry.isIntersecting)),
+            { root: container, rootMargin: '100% 0px' }
+        );
+        this.clear();
+    }
+
+    clear() {
+        this.observer.disconnect();
+        this.container.textContent = '';
+        this.segments = [];
+        this.pages = [];
+        this.pending = [];
+        this.scheduled = false;
+        this.characters = 0;
+    }
+
+    append(text, meta) {
+        const segment = Object.assign({ text: text, time: Date.now() }, meta || {});
+        this.segments.push(segment);
+        this.pending.push(segment);
+        this.characters += text.length;
+        if (!this.scheduled) {
+            this.scheduled = true;
+            requestAnimationFrame(() => this.flush());
+        }
+        return segment;
+    }
+
+    text() {
+        return this.segments.map(segment => segment.text).join(' ');
+    }
+
+    render(segments) {
+        const fragment = document.createDocumentFragment();
+        for (const segment of segments) {
+            const span = document.createElement('span');
+            span.textContent = segment.text + ' ';
+            fragment.appendChild(span);
+        }
+        return fragment;
+    }
+
+    newPage(start) {
+        const element = document.createElement('div');
+        element.dataset.page = this.pages.length;
+        const page = { element: element, start: start, count: 0, live: true };
+        this.pages.push(page);
+        this.container.appendChild(element);
+        this.observer.observe(element);
+        return page;
+    }
+
+    flush() {
+        this.scheduled = false;
+        if (!this.pending.length) {
+            return;
+        }
+        const container = this.container;
+        const pinned = container.scrollHeight - container.scrollTop - container.clientHeight < 40;
+        let page = this.pages[this.pages.length - 1];
+        let index = this.segments.length - this.pending.length;
+        let batch = [];
+        for (const segment of this.pending) {
+            if (!page || page.count === this.pageSize) {
+                if (page && batch.length) {
+                    page.element.appendChild(this.render(batch));
+                }
+                batch = [];
+                page = this.newPage(index);
+            }
+            index++;
+            page.count++;
+            if (page.live) {
+                batch.push(segment);
+            }
+        }
+        if (batch.length) {
+            page.element.appendChild(this.render(batch));
+        }
+        this.pending = [];
+        if (pinned) {
+            container.scrollTop = container.scrollHeight;
+        }
+        this.onFlush();
+    }
+
+    toggle(element, visible) {
+        const page = this.pages[element.dataset.page];
+        if (visible && !page.live) {
+            element.appendChild(this.render(this.segments.slice(page.start, page.start + page.count)));
+            element.style.height = '';
+            page.live = true;
+        } else if (!visible && page.live && page.count === this.pageSize) {
+            element.style.height = element.offsetHeight + 'px';
+            element.textContent = '';
+            page.live = false;
+        }
+    }
+}
+
+// Raw audio capture. The worklet resamples the first input channel to
+// `targetRate` by linear interpolation and posts Int16 PCM in batches of
+// `batchMs`, transferring each buffer instead of copying it.
+const PCM_WORKLET_SOURCE = `
+    class PcmCapture extends AudioWorkletProcessor {
+        constructor(options) {
+            super();
+            const { targetRate, batchMs } = options.processorOptions;
+            this.step = sampleRate / targetRate;
+            this.position = 0;
+            this.last = 0;
+            this.batchSamples = Math.round(targetRate * batchMs / 1000);
+            this.batch = new Int16Array(this.batchSamples);
+            this.filled = 0;
+        }
+
+        process(inputs) {
+            const input = inputs[0][0];
+            if (!input) {
+                return true;
+            }
+            // position runs from -1 (the last sample of the previous block) up.
+            let position = this.position;
+            while (position < input.length - 1) {
+                const index = Math.floor(position);
+                const before = index < 0 ? this.last : input[index];
+                let value = before + (input[index + 1] - before) * (position - index);
+                value = Math.max(-1, Math.min(1, value));
+                this.batch[this.filled++] = value < 0 ? value * 0x8000 : value * 0x7FFF;
+                if (this.filled === this.batchSamples) {
+                    this.port.postMessage(this.batch.buffer, [this.batch.buffer]);
+                    this.batch = new Int16Array(this.batchSamples);
+                    this.filled = 0;
+                }
+                position += this.step;
+            }
+            this.position = position - input.length;
+            this.last = input[input.length - 1];
+            return true;
+        }
+    }
+    registerProcessor('pcm-capture', PcmCapture);
+`;
+
+async function startPcmCapture(stream, onBatch, options) {
+    const { targetRate, batchMs } = Object.assign({ targetRate: 16000, batchMs: 100 }, options || {});
+    const context = new AudioContext();
+    const url = URL.createObjectURL(new Blob([PCM_WORKLET_SOURCE], { type: 'application/javascript' }));
+    try {
+        await context.audioWorklet.addModule(url);
+    } finally {
+        URL.revokeObjectURL(url);
+    }
+    const source = context.createMediaStreamSource(stream);
+    const node = new AudioWorkletNode(context, 'pcm-capture', { processorOptions: { targetRate, batchMs } });
+    node.port.onmessage = event => onBatch(event.data);
+    // The node outputs silence; connecting it keeps the graph pulling it.
+    source.connect(node).connect(context.destination);
+    return {
+        inputRate: context.sampleRate,
+        stop: () => {
+            source.disconnect();
+            node.port.onmessage = null;
+            context.close();
+        }
+    };
+}
+
+// Split text for speech synthesis into sentences, and sentences longer
+// than `maxLength` at clause punctuation, then at spaces. Short chunks
+// start playing sooner, and some engines cut long utterances off.
+function splitSpeech(text, maxLength) {
+    maxLength = maxLength || 200;
+    const chunks = [];
+    const sentences = text.replace(/\s+/g, ' ').match(/[^.!?…]+(?:[.!?…]+["')\]]*|$)\s*/g) || [];
+    for (const sentence of sentences) {
+        let rest = sentence.trim();
+        while (rest.length > maxLength) {
+            const window = rest.slice(0, maxLength);
+            let cut = Math.max(window.lastIndexOf(', '), window.lastIndexOf('; '), window.lastIndexOf(': '),
+                               window.lastIndexOf(' – '), window.lastIndexOf(' — '));
+            if (cut < maxLength / 3) {
+                cut = window.lastIndexOf(' ');
+            }
+            if (cut <= 0) {
+                cut = maxLength - 1;
+            }
+            chunks.push(rest.slice(0, cut + 1).trim());
+            rest = rest.slice(cut + 1).trim();
+        }
+        if (rest) {
+            chunks.push(rest);
+        }
+    }
+    return chunks;
+}
+
+// Players for SpeechQueue. start() queues a chunk behind any already
+// started and reports through events.start() and events.end(failed).
+const BROWSER_VOICE = {
+    start(chunk, options, events) {
+        const utterance = new SpeechSynthesisUtterance(chunk);
+        if (options.voice) {
+            utterance.voice = options.voice;
+        }
+        utterance.rate = options.rate;
+        utterance.onstart = () => events.start();
+        utterance.onend = () => events.end(false);
+        utterance.onerror = () => events.end(true);
+        speechSynthesis.speak(utterance);
+        return utterance;
+    },
+    pause: () => window.speechSynthesis && speechSynthesis.pause(),
+    resume: () => window.speechSynthesis && speechSynthesis.resume(),
+    cancel: () => window.speechSynthesis && speechSynthesis.cancel()
+};
+
+// Plays audio rendered by the server at `path` (see offline_tts.py), one
+// <audio> element per chunk. Queued elements start loading straight away,
+// so the next chunk is usually ready when the current one ends.
+function serverVoice(path) {
+    const queue = [];
+    let paused = false;
+    const playHead = () => {
+        if (queue.length && !paused) {
+            const head = queue[0];
+            head.audio.play().catch(() => finish(head, true));
+        }
+    };
+    const finish = (item, failed) => {
+        if (queue[0] === item) {
+            queue.shift();
+            item.events.end(failed);
+            playHead();
+        }
+    };
+    return {
+        start(chunk, options, events) {
+            const params = new URLSearchParams({
+                text: chunk,
+                voice: options.voice ? options.voice.lang.toLowerCase() : 'en-us',
+                rate: options.rate
+            });
+            const audio = new Audio(serverUrl(`${path}?${params}`));
+            audio.preload = 'auto';
+            const item = { audio: audio, events: events };
+            audio.onplaying = () => events.start();
+            audio.onended = () => finish(item, false);
+            audio.onerror = () => finish(item, true);
+            queue.push(item);
+            if (queue.length === 1) {
+                playHead();
+            }
+            return audio;
+        },
+        pause() {
+            paused = true;
+            if (queue.length) {
+                queue[0].audio.pause();
+            }
+        },
+        resume() {
+            paused = false;
+            playHead();
+        },
+        cancel() {
+            for (const item of queue.splice(0)) {
+                item.audio.pause();
+                item.audio.removeAttribute('src');
+            }
+        }
+    };
+}
+
+// Speak text as a queue of chunks. `lookahead` chunks at a time are handed
+// to the player, so it moves straight on to the next one instead of
+// waiting for our end handler. Each run is tagged with a generation, so
+// the events a player fires for chunks cancelled by stop() or skip() are
+// ignored. Time to first audio and the gaps between chunks (time spent
+// paused excluded) are measured from the chunks' start and end events.
+class SpeechQueue {
+    constructor(options) {
+        Object.assign(this, {
+            player: BROWSER_VOICE,
+            voice: null,
+            rate: 1,
+            lookahead: 2,
+            maxLength: 200,
+            onUpdate: () => {}
+        }, options || {});
+        this.generation = 0;
+        this.chunks = [];
+        this.reset();
+    }
+
+    reset() {
+        this.utterances = [];
+        this.next = 0;
+        this.finished = 0;
+        this.current = -1;
+        this.requestedAt = performance.now();
+        this.firstAudioMs = null;
+        this.lastEndAt = null;
+        this.pausedAt = null;
+        this.gaps = [];
+        this.skipped = 0;
+        this.errors = 0;
+    }
+
+    speak(text) {
+        this.stop();
+        this.chunks = splitSpeech(text, this.maxLength);
+        this.reset();
+        this.fill();
+        this.onUpdate(this.stats());
+    }
+
+    fill() {
+        const generation = this.generation;
+        while (this.next < this.chunks.length && this.next - this.finished < this.lookahead) {
+            const index = this.next++;
+            let settled = false;
+            const settle = (failed) => {
+                if (settled || generation !== this.generation) {
+                    return;
+                }
+                settled = true;
+                this.errors += failed ? 1 : 0;
+                this.finished = Math.max(this.finished, index + 1);
+                this.lastEndAt = failed ? null : performance.now();
+                this.fill();
+                this.onUpdate(this.stats());
+            };
+            const start = () => {
+                if (generation !== this.generation) {
+                    return;
+                }
+                const now = performance.now();
+                this.current = index;
+                if (this.firstAudioMs === null) {
+                    this.firstAudioMs = now - this.requestedAt;
+                } else if (this.lastEndAt !== null) {
+                    this.gaps.push(now - this.lastEndAt);
+                }
+                this.lastEndAt = null;
+                this.onUpdate(this.stats());
+            };
+            // Keep a reference: some engines drop the events of an
+            // utterance that has been garbage collected.
+            this.utterances[index] = this.player.start(this.chunks[index], { voice: this.voice, rate: this.rate },
+                                                       { start: start, end: settle });
+        }
+    }
+
+    pause() {
+        if (this.pausedAt === null && this.finished < this.chunks.length) {
+            this.player.pause();
+            this.pausedAt = performance.now();
+            this.onUpdate(this.stats());
+        }
+    }
+
+    resume() {
+        if (this.pausedAt !== null) {
+            this.player.resume();
+            if (this.lastEndAt !== null) {
+                this.lastEndAt += performance.now() - this.pausedAt;
+            }
+            this.pausedAt = null;
+            this.onUpdate(this.stats());
+        }
+    }
+
+    skip() {
+        if (this.finished >= this.chunks.length) {
+            return;
+        }
+        const from = Math.min(this.chunks.length, Math.max(this.current + 1, this.finished));
+        this.generation++;
+        this.player.cancel();
+        if (this.pausedAt !== null) {
+            this.player.resume();
+            this.pausedAt = null;
+        }
+        this.skipped++;
+        this.next = this.finished = from;
+        this.lastEndAt = null;
+        this.fill();
+        this.onUpdate(this.stats());
+    }
+
+    stop() {
+        this.generation++;
+        this.player.cancel();
+        if (this.pausedAt !== null) {
+            this.player.resume();
+        }
+        this.finished = this.next = this.chunks.length;
+        this.pausedAt = null;
+    }
+
+    stats() {
+        const gaps = this.gaps;
+        const state = this.finished >= this.chunks.length ? 'done' : this.pausedAt !== null ? 'paused' : 'speaking';
+        return {
+            state: state,
+            chunks: this.chunks.length,
+            current: this.current,
+            text: this.chunks[this.current] || '',
+            spoken: this.finished,
+            time_to_first_audio_ms: this.firstAudioMs === null ? null : Math.round(this.firstAudioMs),
+            gap_avg_ms: gaps.length ? Math.round(gaps.reduce((a, b) => a + b, 0) / gaps.length) : null,
+            gap_max_ms: gaps.length ? Math.round(Math.max(...gaps)) : null,
+            skipped: this.skipped,
+            errors: this.errors
+        };
+    }
+}
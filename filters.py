@@ -0,0 +1,186 @@
+import threading
+import time
+import zlib
+
+import streamlit as st
+
+from asset_server import register_route
+
+DEFAULT_PIPELINE = "resize:320,grayscale,blur,edge,histogram"
+
+# Taps of the 5x5 binomial blur, applied once per axis; they sum to 16.
+_BLUR_TAPS = (1, 4, 6, 4, 1)
+
+
+# Every filter takes and returns a batch of frames shaped (N, H, W, C), uint8,
+# with C = 3 (RGB) or 1 (gray). They use integer arithmetic only, so the
+# browser's worker (filterWorkerMain in demos/runtime.js) produces
+# byte-identical output for the same pipeline.
+
+def resize(frames, max_dimension=320):
+    """Box-downscale by the smallest integer factor that fits ``max_dimension``."""
+    import numpy as np
+
+    if max_dimension < 1:
+        raise ValueError(f"resize needs a max dimension of at least 1, not {max_dimension}")
+    n, height, width, channels = frames.shape
+    factor = max(1, -(-max(height, width) // max_dimension))
+    if factor == 1:
+        return frames
+    out_h, out_w = height // factor, width // factor
+    blocks = frames[:, :out_h * factor, :out_w * factor].reshape(n, out_h, factor, out_w, factor, channels)
+    area = factor * factor
+    # Adding strided views into a narrow accumulator is several times
+    # faster than blocks.sum(axis=(2, 4)).
+    dtype = np.uint16 if area * 255 + area // 2 <= 0xFFFF else np.uint32
+    sums = np.zeros((n, out_h, out_w, channels), dtype)
+    for dy in range(factor):
+        for dx in range(factor):
+            sums += blocks[:, :, dy, :, dx]
+    return ((sums + area // 2) // area).astype(np.uint8)
+
+
+def grayscale(frames):
+    """ITU-R BT.601 luma, rounded to the nearest integer."""
+    import numpy as np
+
+    if frames.shape[-1] == 1:
+        return frames
+    rgb = frames.astype(np.uint32)
+    luma = (299 * rgb[..., 0] + 587 * rgb[..., 1] + 114 * rgb[..., 2] + 500) // 1000
+    return luma.astype(np.uint8)[..., np.newaxis]
+
+
+def blur(frames):
+    """5x5 binomial (Gaussian-like) blur with clamped edges."""
+    import numpy as np
+
+    # 256 * 255 + 128 still fits in 16 bits.
+    padded = np.pad(frames.astype(np.uint16), ((0, 0), (2, 2), (2, 2), (0, 0)), mode="edge")
+    height, width = frames.shape[1:3]
+    rows = sum(tap * padded[:, :, offset:offset + width] for offset, tap in enumerate(_BLUR_TAPS))
+    both = sum(tap * rows[:, offset:offset + height] for offset, tap in enumerate(_BLUR_TAPS))
+    return ((both + 128) >> 8).astype(np.uint8)
+
+
+def edge(frames):
+    """Sobel gradient magnitude (L1, halved and clipped) of the luma."""
+    import numpy as np
+
+    # |gx| + |gy| is at most 2040, so 16 bits are enough.
+    gray = np.pad(grayscale(frames)[..., 0].astype(np.int16), ((0, 0), (1, 1), (1, 1)), mode="edge")
+    height, width = frames.shape[1:3]
+
+    def at(dy, dx):
+        return gray[:, 1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+
+    gx = (at(-1, 1) + 2 * at(0, 1) + at(1, 1)) - (at(-1, -1) + 2 * at(0, -1) + at(1, -1))
+    gy = (at(1, -1) + 2 * at(1, 0) + at(1, 1)) - (at(-1, -1) + 2 * at(-1, 0) + at(-1, 1))
+    magnitude = np.minimum(255, (np.abs(gx) + np.abs(gy)) >> 1)
+    return magnitude.astype(np.uint8)[..., np.newaxis]
+
+
+def histogram(frames):
+    """256-bin counts per frame and channel, shaped (N, C, 256)."""
+    import numpy as np
+
+    n, _, _, channels = frames.shape
+    offsets = (np.arange(n * channels, dtype=np.int64) * 256).reshape(n, 1, 1, channels)
+    counts = np.bincount((frames + offsets).ravel(), minlength=n * channels * 256)
+    return counts.reshape(n, channels, 256)
+
+
+FILTERS = {"resize": resize, "grayscale": grayscale, "blur": blur, "edge": edge}
+MEASUREMENTS = {"histogram": histogram}
+
+
+def parse_pipeline(spec):
+    """Parse ``"resize:320,grayscale,blur"`` into ``[(name, args), ...]``."""
+    steps = []
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, arg = part.partition(":")
+        if name not in FILTERS and name not in MEASUREMENTS:
+            raise ValueError(f"unknown filter {name!r}")
+        if arg and name != "resize":
+            raise ValueError(f"{name} takes no argument")
+        steps.append((name, (int(arg),) if arg else ()))
+    return steps
+
+
+def run_pipeline(frames, steps):
+    """Apply ``steps`` to a batch; return the frames and any measurements."""
+    measurements = {}
+    for name, args in steps:
+        if name in MEASUREMENTS:
+            measurements[name] = MEASUREMENTS[name](frames, *args)
+        else:
+            frames = FILTERS[name](frames, *args)
+    return frames, measurements
+
+
+def decode_rgba(body, width, height):
+    """Split a body of back-to-back RGBA frames into an (N, H, W, 3) batch."""
+    import numpy as np
+
+    frame_bytes = width * height * 4
+    if not frame_bytes or len(body) % frame_bytes:
+        raise ValueError(f"body is not a whole number of {width}x{height} RGBA frames")
+    return np.frombuffer(body, dtype=np.uint8).reshape(-1, height, width, 4)[..., :3]
+
+
+class FilterService:
+    """Run filter pipelines over batches of frames uploaded by the demos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.seconds = 0.0
+
+    def process(self, frames, spec):
+        steps = parse_pipeline(spec)
+        start = time.perf_counter()
+        output, measurements = run_pipeline(frames, steps)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.batches += 1
+            self.frames += len(frames)
+            self.seconds += elapsed
+        return output, measurements, elapsed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "frames_per_sec": round(self.frames / self.seconds, 1) if self.seconds else 0.0,
+            }
+
+    def handle_batch(self, body, headers, query):
+        """Asset-server route: ``POST /filters?pipeline=&width=&height=``.
+
+        The body is one or more raw RGBA frames of the given size. The reply
+        has a CRC-32 of each output frame, so the browser can check that its
+        worker produced the same bytes, plus the time the batch took.
+        """
+        frames = decode_rgba(body, int(query.get("width", 0)), int(query.get("height", 0)))
+        output, measurements, elapsed = self.process(frames, query.get("pipeline", DEFAULT_PIPELINE))
+        reply = {
+            "frames": len(frames),
+            "shape": list(output.shape[1:]),
+            "crc32": [zlib.crc32(frame.tobytes()) for frame in output],
+            "ms": round(elapsed * 1000, 2),
+            "frames_per_sec": round(len(frames) / elapsed, 1) if elapsed else None,
+        }
+        if "histogram" in measurements:
+            reply["histogram_crc32"] = [zlib.crc32(counts.astype("<u4").tobytes())
+                                        for counts in measurements["histogram"]]
+        return 200, reply
+
+
+@st.cache_resource(show_spinner=False)
+def filter_service():
+    """The process-wide filter service, reachable at ``POST /filters``."""
+    service = FilterService()
+    register_route("POST", "/filters", service.handle_batch)
+    return service
@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import streamlit as st
+
+from gemini_proxy import DEFAULT_MODEL, GEMINI_API_BASE, GeminiProxy
+
+BATCH_DIR = Path(os.environ.get("DEMO_BATCH_DIR", Path(__file__).parent / "batches"))
+# Statuses worth retrying: rate limited, or the API or the path to it failed.
+RETRYABLE = {429, 500, 502, 503, 504}
+
+_SECONDS = re.compile(r"([0-9.]+)s")
+
+
+def request_for(prompt, generation_config=None):
+    request = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config:
+        request["generationConfig"] = generation_config
+    return request
+
+
+def parse_prompts(text, fmt, generation_config=None):
+    """Rows of a CSV or JSONL document as ``{"row", "id", "request"}`` dicts.
+
+    A CSV takes its prompt from the ``prompt`` column, else the first one,
+    and its id from an ``id`` column if there is one. A JSONL line is
+    either ``{"prompt": ...}`` or a whole ``generateContent`` request with
+    ``contents``, and may carry an ``id``. ``row`` numbers the prompts from
+    0 in file order; it is what a resumed run matches on.
+    """
+    rows = []
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames:
+            return rows
+        column = "prompt" if "prompt" in reader.fieldnames else reader.fieldnames[0]
+        for record in reader:
+            # A short row leaves the missing columns as None.
+            prompt = (record.get(column) or "").strip()
+            if prompt:
+                rows.append({"row": len(rows), "id": record.get("id"),
+                             "request": request_for(record[column], generation_config)})
+    elif fmt == "jsonl":
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise ValueError(f"line {number} is not JSON") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"line {number} is not an object")
+            if "contents" in record:
+                request = {key: value for key, value in record.items() if key != "id"}
+            elif "prompt" in record:
+                request = request_for(record["prompt"], generation_config)
+            else:
+                raise ValueError(f"line {number} has neither prompt nor contents")
+            rows.append({"row": len(rows), "id": record.get("id"), "request": request})
+    else:
+        raise ValueError(f"unsupported format {fmt!r}; use csv or jsonl")
+    return rows
+
+
+def read_prompts(path, generation_config=None):
+    path = Path(path)
+    return parse_prompts(path.read_text(encoding="utf-8"), path.suffix.lower().lstrip("."), generation_config)
+
+
+def completed_rows(path):
+    """Rows already answered in a results file; a torn last line is cut off first."""
+    path = Path(path)
+    if not path.exists():
+        return set()
+    with open(path, "r+b") as results:
+        data = results.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            results.truncate(end)
+    done = set()
+    for line in data[:end].splitlines():
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        if result.get("status") == 200:
+            done.add(result["row"])
+    return done
+
+
+def retry_delay(payload):
+    """Seconds the API asks to wait (``RetryInfo.retryDelay``), or 0."""
+    for detail in payload.get("error", {}).get("details", []):
+        if detail.get("@type", "").endswith("RetryInfo"):
+            match = _SECONDS.fullmatch(str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    return 0.0
+
+
+def backoff_delay(attempt, base_delay, max_delay, hint=0.0):
+    """Full-jitter exponential backoff, but never sooner than the API asked."""
+    return max(hint, random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1))))
+
+
+def percentile(values, share):
+    return values[int(share * (len(values) - 1))] if values else 0.0
+
+
+class TokenBucket:
+    """Let ``rate`` callers per second through on average, in bursts of up to ``capacity``.
+
+    Waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BatchRunner:
+    """Answer a batch of prompts through a GeminiProxy, appending results to a JSONL file.
+
+    At most ``concurrency`` requests are in flight and new ones start no
+    faster than ``rpm`` per minute (bursts of ``burst``). A 429 or 5xx is
+    retried up to ``max_attempts`` times with jittered exponential backoff.
+    Each result is written and flushed as soon as it completes, so after a
+    crash ``run`` on the same output skips the rows that already succeeded.
+    Requests go out on the proxy's pooled session from a thread pool of
+    ``concurrency`` threads, driven by one asyncio loop.
+    """
+
+    def __init__(self, proxy, model=DEFAULT_MODEL, concurrency=8, rpm=60, burst=None, max_attempts=6,
+                 base_delay=1.0, max_delay=60.0, on_result=None):
+        self.proxy = proxy
+        self.model = model
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_result = on_result or (lambda result, summary: None)
+
+    async def run(self, rows, output):
+        """Answer ``rows`` not yet in ``output``; return a summary of this run."""
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        done = completed_rows(output)
+        pending = [row for row in rows if row["row"] not in done]
+        summary = {"rows": len(rows), "resumed": len(rows) - len(pending), "pending": len(pending),
+                   "succeeded": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+        latencies = []
+        bucket = TokenBucket(self.rpm / 60, self.burst)
+        remaining = iter(pending)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        with open(output, "a", encoding="utf-8") as sink, \
+                ThreadPoolExecutor(self.concurrency, thread_name_prefix="gemini-batch") as executor:
+            async def worker():
+                for row in remaining:
+                    result = await self._answer(row, bucket, loop, executor, summary)
+                    sink.write(json.dumps(result) + "\n")
+                    sink.flush()
+                    summary["succeeded" if result["status"] == 200 else "failed"] += 1
+                    latencies.append(result["latency_ms"])
+                    self.on_result(result, summary)
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        summary.update({
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_p50_ms": round(statistics.median(latencies), 1) if latencies else 0.0,
+            "latency_p95_ms": round(percentile(latencies, 0.95), 1),
+            "latency_p99_ms": round(percentile(latencies, 0.99), 1),
+        })
+        return summary
+
+    async def _answer(self, row, bucket, loop, executor, summary):
+        for attempt in range(1, self.max_attempts + 1):
+            await bucket.acquire()
+            if attempt == 1:
+                # Latency runs from the first send: time spent queued behind
+                # the rate limit is the quota's cost, not the API's.
+                start = time.perf_counter()
+            status, payload = await loop.run_in_executor(executor, self.proxy.generate, self.model, row["request"])
+            if status not in RETRYABLE or attempt == self.max_attempts:
+                break
+            summary["retries"] += 1
+            summary["rate_limited"] += status == 429
+            await asyncio.sleep(backoff_delay(attempt, self.base_delay, self.max_delay, retry_delay(payload)))
+        result = {"row": row["row"], "id": row["id"], "status": status, "attempts": attempt,
+                  "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+        if status == 200:
+            candidates = payload.get("candidates") or [{}]
+            result["text"] = "".join(part.get("text", "") for part in candidates[0].get("content", {}).get("parts", []))
+            result["finish_reason"] = candidates[0].get("finishReason")
+            result["usage"] = payload.get("usageMetadata")
+        else:
+            result["error"] = payload.get("error", {}).get("message", "")
+        return result
+
+
+class BatchJob:
+    """A BatchRunner run on its own thread, so the page that started it stays responsive.
+
+    ``summary`` is the runner's live summary once the first row completes
+    and its final one when the run ends; ``error`` is set if the run failed.
+    """
+
+    def __init__(self, runner, rows, output):
+        self.output = Path(output)
+        self.summary = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        runner.on_result = self._progress
+        self._thread = threading.Thread(target=self._run, args=(runner, rows), name="gemini-batch-job", daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self.finished_at is None
+
+    def _progress(self, result, summary):
+        self.summary = summary
+
+    def _run(self, runner, rows):
+        try:
+            self.summary = asyncio.run(runner.run(rows, self.output))
+        except Exception as exc:
+            self.error = str(exc) or type(exc).__name__
+        finally:
+            self.finished_at = time.time()
+
+
+class BatchJobs:
+    """Batch jobs by results file: one run per file at a time.
+
+    The last job of each file is kept after it ends, up to ``history``
+    finished jobs, so a page can show how it went.
+    """
+
+    def __init__(self, history=20):
+        self.history = history
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def start(self, runner, rows, output):
+        """Run ``rows`` into ``output`` unless a run into it is already going; return that job."""
+        with self._lock:
+            job = self._jobs.get(output)
+            if job is None or not job.running:
+                self._jobs.pop(output, None)
+                job = self._jobs[output] = BatchJob(runner, rows, output)
+                finished = [key for key, other in self._jobs.items() if not other.running]
+                for key in finished[:max(0, len(finished) - self.history)]:
+                    del self._jobs[key]
+            return job
+
+    def get(self, output):
+        return self._jobs.get(output)
+
+
+@st.cache_resource(show_spinner=False)
+def batch_jobs():
+    """The process-wide batch jobs, shared by every session."""
+    return BatchJobs()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a CSV or JSONL file of prompts with Gemini.")
+    parser.add_argument("prompts", help="CSV with a prompt column, or JSONL of {prompt} or requests")
+    parser.add_argument("--out", help="results JSONL (default: batches/<name>.results.jsonl); reruns resume it")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--rpm", type=float, default=60, help="requests started per minute, as per the quota")
+    parser.add_argument("--burst", type=float, help="requests that may start at once (default: one second's worth)")
+    parser.add_argument("--max-attempts", type=int, default=6)
+    parser.add_argument("--temperature", type=float, help="generationConfig temperature for plain prompts")
+    parser.add_argument("--base-url", default=GEMINI_API_BASE)
+    args = parser.parse_args(argv)
+
+    config = {"temperature": args.temperature} if args.temperature is not None else None
+    rows = read_prompts(args.prompts, config)
+    output = Path(args.out) if args.out else BATCH_DIR / f"{Path(args.prompts).stem}.results.jsonl"
+    proxy = GeminiProxy(args.base_url, pool_size=args.concurrency)
+    if not proxy.key:
+        parser.error("GEMINI_API_KEY is not set")
+
+    def progress(result, summary):
+        finished = summary["succeeded"] + summary["failed"]
+        print(f"\r{finished}/{summary['pending']} done · {summary['failed']} failed · "
+              f"{summary['retries']} retries", end="", flush=True)
+
+    runner = BatchRunner(proxy, args.model, args.concurrency, args.rpm, args.burst, args.max_attempts,
+                         on_result=progress)
+    summary = asyncio.run(runner.run(rows, output))
+    print(f"\n{output}: {summary['succeeded']} succeeded, {summary['failed']} failed, "
+          f"{summary['resumed']} already done · {summary['rows_per_sec']} rows/s · "
+          f"p50 {summary['latency_p50_ms']} ms · p95 {summary['latency_p95_ms']} ms · "
+          f"p99 {summary['latency_p99_ms']} ms · {summary['retries']} retries "
+          f"({summary['rate_limited']} rate limited)")
+
+
+if __name__ == "__main__":
+    main()
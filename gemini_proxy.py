@@ -0,0 +1,579 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import streamlit as st
+
+from asset_server import register_route
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+DEFAULT_MODEL = "gemini-1.5-flash-latest"
+GEMINI_CACHE_DIR = Path(os.environ.get("DEMO_GEMINI_CACHE_DIR", Path(__file__).parent / "gemini_cache"))
+# Sampling settings of a request's deterministic mode: greedy decoding, so
+# the same prompt gets the same reply and caching it loses nothing.
+DETERMINISTIC_CONFIG = {"temperature": 0, "topK": 1, "topP": 1, "candidateCount": 1}
+
+_MODEL = re.compile(r"[A-Za-z0-9._-]{1,64}")
+# Fields of a generateContent request that are passed through to the API.
+_REQUEST_FIELDS = ("contents", "generationConfig", "safetySettings", "systemInstruction", "tools", "toolConfig")
+
+
+def api_key():
+    """The server's Gemini key: ``GEMINI_API_KEY``, else the app's secrets."""
+    key = os.environ.get("GEMINI_API_KEY")
+    if key:
+        return key
+    try:
+        return st.secrets.get("GEMINI_API_KEY", "")
+    except FileNotFoundError:
+        return ""
+
+
+def api_error(status, message, reason="UNAVAILABLE"):
+    """An error payload shaped like the Gemini API's own."""
+    return {"error": {"code": status, "message": message, "status": reason}}
+
+
+def cache_key(model, request):
+    """Hex digest naming the reply to ``request`` from ``model``.
+
+    Prompt text is keyed with its whitespace collapsed; generationConfig,
+    safetySettings and the other fields are keyed as given.
+    """
+    contents = [dict(content, parts=[dict(part, text=" ".join(part["text"].split())) if "text" in part else part
+                                     for part in content.get("parts", [])])
+                for content in request.get("contents", [])]
+    keyed = json.dumps([model, dict(request, contents=contents)], sort_keys=True)
+    return hashlib.sha256(keyed.encode("utf-8")).hexdigest()
+
+
+def cacheable(request):
+    """Only greedy replies are cached; a sampled one should differ on every call."""
+    return request.get("generationConfig", {}).get("temperature") == 0
+
+
+class ResponseCache:
+    """Gemini replies by key: an in-memory LRU in front of JSON files on disk.
+
+    The memory tier holds the ``max_entries`` most recently used replies.
+    The disk tier keeps every reply for ``ttl`` seconds, taking a file's
+    mtime as its write time, so cached replies survive a restart but
+    expire like the memory ones.
+    """
+
+    def __init__(self, root=GEMINI_CACHE_DIR, max_entries=512, ttl=24 * 3600):
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (written, payload)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        for path in self.root.glob("*/*"):
+            if path.suffix == ".tmp" or now - path.stat().st_mtime > ttl:
+                path.unlink(missing_ok=True)
+
+    def path(self, key):
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """The cached reply for ``key``, or None if there is none or it expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+        entry = self._read(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def _read(self, key, now):
+        path = self.path(key)
+        try:
+            written = path.stat().st_mtime
+            if now - written > self.ttl:
+                path.unlink(missing_ok=True)
+                with self._lock:
+                    self.expired += 1
+                return None
+            return written, json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key, payload):
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        temporary = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(temporary, path)
+        with self._lock:
+            self.stores += 1
+            self._remember(key, (time.time(), payload))
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "expired": self.expired,
+                "memory_entries": len(self._memory),
+            }
+
+
+class _Flight:
+    """One upstream call, shared by every identical request made while it runs."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.result = None  # (status, payload); payload None while a stream is live
+        self.chunks = []  # a stream's events so far
+        self.done = False
+        self.listeners = 1
+        self.closing = False  # a stream nobody listens to any more, being closed
+
+
+class GeminiProxy:
+    """Forward the demos' Gemini calls from the server.
+
+    The API key stays on the server and is sent as a header, never in a
+    URL. All calls share one ``requests.Session`` whose adapter keeps up to
+    ``pool_size`` connections open per host and makes callers wait for a
+    free one beyond that, so after warm-up requests reuse established TLS
+    connections instead of handshaking each time. ``base_url`` can point
+    at ``gemini_stub.py`` to test offline. With a ``cache``, the demo
+    routes answer repeated deterministic requests without calling the API,
+    and identical requests arriving while one is in flight share its call.
+    """
+
+    def __init__(self, base_url=GEMINI_API_BASE, key=None, pool_size=16, timeout=(5, 120), cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.key = api_key() if key is None else key
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._first_token_times = deque(maxlen=1000)
+        self._token_rates = deque(maxlen=1000)
+        self.requests = 0
+        self.errors = 0
+        self.streams = 0
+        self.cancelled = 0
+        self.bypassed = 0
+        self.coalesced = 0
+        self._flights = {}
+
+    @property
+    def session(self):
+        # requests is imported on first use; it is too slow for app start-up.
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, pool_block=True)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"x-goog-api-key": self.key, "Content-Type": "application/json"})
+                self._session = session
+            return self._session
+
+    def generate(self, model, request):
+        """POST ``request`` to ``models/<model>:generateContent``; return ``(status, payload)``."""
+        import requests
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.base_url}/models/{model}:generateContent",
+                                         data=json.dumps(request), timeout=self.timeout)
+            status = response.status_code
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = api_error(status, response.text[:500])
+        except requests.RequestException as exc:
+            status, payload = 502, api_error(502, f"Gemini API unreachable: {exc}")
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.requests += 1
+            self.errors += status != 200
+            self._latencies.append(elapsed)
+        return status, payload
+
+    def stream(self, model, request, store_as=None):
+        """POST ``request`` to ``models/<model>:streamGenerateContent?alt=sse``.
+
+        Returns ``(status, payload)``. On success the payload is a
+        generator of server-sent events: the API's own ``data:`` events as
+        they arrive, then an ``event: proxy`` with the time to first token
+        and tokens/s measured here. Closing the generator early (the client
+        went away) closes the upstream response. A reply streamed to the
+        end is put in the cache under ``store_as``, if given, as one
+        ``generateContent`` response.
+        """
+        import requests
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.base_url}/models/{model}:streamGenerateContent?alt=sse",
+                                         data=json.dumps(request), timeout=self.timeout, stream=True)
+        except requests.RequestException as exc:
+            status, payload = 502, api_error(502, f"Gemini API unreachable: {exc}")
+        else:
+            if response.status_code == 200:
+                return 200, self._relay(response, start, store_as)
+            status = response.status_code
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = api_error(status, response.text[:500])
+            response.close()
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+        return status, payload
+
+    def _relay(self, response, start, store_as):
+        import requests
+
+        first_token_ms = None
+        texts = []
+        last = {}
+        tokens = words = 0
+        finished = failed = False
+        summary = None
+        try:
+            # chunk_size=None hands over each chunk as it arrives instead of
+            # waiting for 512 bytes, which would hold back short events.
+            for line in response.iter_lines(chunk_size=None):
+                if not line.startswith(b"data:"):
+                    continue
+                event = json.loads(line[5:])
+                text = "".join(part.get("text", "") for candidate in event.get("candidates", [])
+                               for part in candidate.get("content", {}).get("parts", []))
+                if text and first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                texts.append(text)
+                last = event
+                words += len(text.split())
+                tokens = event.get("usageMetadata", {}).get("candidatesTokenCount", tokens)
+                yield line + b"\n\n"
+            elapsed = (time.perf_counter() - start) * 1000
+            tokens = tokens or words
+            summary = {
+                "first_token_ms": round(first_token_ms or elapsed, 1),
+                "total_ms": round(elapsed, 1),
+                "tokens": tokens,
+                "tokens_per_sec": round(tokens / max(elapsed - (first_token_ms or 0), 1) * 1000, 1),
+            }
+            finished = True
+            if store_as and self.cache is not None and last.get("candidates"):
+                candidate = dict(last["candidates"][0], content={"parts": [{"text": "".join(texts)}], "role": "model"})
+                try:
+                    self.cache.put(store_as, dict(last, candidates=[candidate]))
+                except OSError:
+                    # The client already has the whole reply; only the cache misses out.
+                    logger.exception("could not cache streamed reply %s", store_as)
+            yield b"event: proxy\ndata: " + json.dumps(summary).encode("utf-8") + b"\n\n"
+        except requests.RequestException as exc:
+            failed = True
+            error = api_error(502, f"Gemini stream interrupted: {exc}")
+            yield b"event: error\ndata: " + json.dumps(error).encode("utf-8") + b"\n\n"
+        except (ValueError, KeyError, AttributeError) as exc:
+            failed = True
+            error = api_error(502, f"Gemini sent a malformed stream event: {exc}")
+            yield b"event: error\ndata: " + json.dumps(error).encode("utf-8") + b"\n\n"
+        finally:
+            response.close()
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.requests += 1
+                self.streams += 1
+                self.errors += failed
+                self.cancelled += not (finished or failed)
+                self._latencies.append(elapsed)
+                if summary is not None and first_token_ms is not None:
+                    self._first_token_times.append(first_token_ms)
+                    self._token_rates.append(summary["tokens_per_sec"])
+
+    def _replay(self, reply):
+        tokens = reply.get("usageMetadata", {}).get("candidatesTokenCount", 0)
+        yield b"data: " + json.dumps(reply).encode("utf-8") + b"\n\n"
+        summary = {"cached": True, "first_token_ms": 0, "total_ms": 0, "tokens": tokens}
+        yield b"event: proxy\ndata: " + json.dumps(summary).encode("utf-8") + b"\n\n"
+
+    def lookup(self, model, request, bypass=False):
+        """Return ``(key, cached reply)`` for a request.
+
+        The key is None when the reply must not be cached, and the reply
+        None on a miss or when ``bypass`` skips the lookup; a bypassed
+        request still refreshes the cache with its new reply.
+        """
+        if self.cache is None or not cacheable(request):
+            return None, None
+        key = cache_key(model, request)
+        if bypass:
+            with self._lock:
+                self.bypassed += 1
+            return key, None
+        return key, self.cache.get(key)
+
+    def _join(self, key):
+        """Return ``(flight, leader)``: the call in flight for ``key``, or a new one to make."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                # Counted under both locks, so _pump cannot see the listeners
+                # drop to zero and close the stream while a request joins it.
+                with flight.condition:
+                    if not flight.closing:
+                        flight.listeners += 1
+                        self.coalesced += 1
+                        return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _land(self, key, flight, result=None):
+        with self._lock:
+            # A closing stream may already have been replaced by a new flight.
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.condition:
+            flight.result = flight.result or result
+            flight.done = True
+            flight.condition.notify_all()
+
+    def _await(self, flight):
+        with flight.condition:
+            while flight.result is None:
+                flight.condition.wait()
+            return flight.result
+
+    def generate_shared(self, model, request, key, store=False):
+        """``generate``, with one upstream call for identical concurrent requests.
+
+        The first request for ``key`` makes the call and the others wait for
+        its result. With ``store`` a 200 reply is cached before the call is
+        released, so a request arriving just after finds it in the cache.
+        """
+        flight, leader = self._join(("generate", key))
+        if not leader:
+            return self._await(flight)
+        result = (502, api_error(502, "Gemini request failed"))
+        try:
+            result = self.generate(model, request)
+            if store and result[0] == 200:
+                try:
+                    self.cache.put(key, result[1])
+                except OSError:
+                    # The reply is good; only the cache misses out.
+                    logger.exception("could not cache reply %s", key)
+        finally:
+            self._land(("generate", key), flight, result)
+        return result
+
+    def stream_shared(self, model, request, key, store_as=None):
+        """``stream``, with one upstream stream for identical concurrent requests.
+
+        A thread reads the upstream events into the flight and every
+        request, the first included, replays them from there, so one that
+        joins late first gets what it missed. The upstream stream is closed
+        once every request sharing it has gone away.
+        """
+        flight, leader = self._join(("stream", key))
+        if leader:
+            try:
+                status, payload = self.stream(model, request, store_as)
+            except BaseException:
+                self._land(("stream", key), flight, (502, api_error(502, "Gemini request failed")))
+                raise
+            if status != 200:
+                self._land(("stream", key), flight, (status, payload))
+                return status, payload
+            with flight.condition:
+                flight.result = (200, None)
+                flight.condition.notify_all()
+            threading.Thread(target=self._pump, args=(("stream", key), flight, payload),
+                             name="gemini-stream", daemon=True).start()
+        status, payload = self._await(flight)
+        return (200, self._follow(flight)) if payload is None else (status, payload)
+
+    def _pump(self, key, flight, events):
+        try:
+            for chunk in events:
+                with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+                    if flight.listeners == 0:
+                        flight.closing = True
+                        break
+        finally:
+            # Stops the stream early when nobody is listening any more.
+            events.close()
+            self._land(key, flight)
+
+    def _follow(self, flight):
+        sent = 0
+        try:
+            while True:
+                with flight.condition:
+                    while sent == len(flight.chunks) and not flight.done:
+                        flight.condition.wait()
+                    chunks = flight.chunks[sent:]
+                    done = flight.done
+                sent += len(chunks)
+                yield from chunks
+                if done:
+                    return
+        finally:
+            with flight.condition:
+                flight.listeners -= 1
+
+    def connections_opened(self):
+        """How many connections the pool has opened so far."""
+        if self._session is None:
+            return 0
+        total = 0
+        for adapter in set(self._session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            total += sum(pools[key].num_connections for key in pools.keys())
+        return total
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = {
+                "configured": bool(self.key),
+                "base_url": self.base_url,
+                "requests": self.requests,
+                "errors": self.errors,
+                "streams": self.streams,
+                "cancelled": self.cancelled,
+                "cache_bypassed": self.bypassed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
+            first_token_times = sorted(self._first_token_times)
+            token_rates = sorted(self._token_rates)
+        counters["connections_opened"] = self.connections_opened()
+        if latencies:
+            counters["latency_p50_ms"] = round(statistics.median(latencies), 1)
+            counters["latency_p95_ms"] = round(latencies[int(0.95 * (len(latencies) - 1))], 1)
+        if first_token_times:
+            counters["first_token_p50_ms"] = round(statistics.median(first_token_times), 1)
+            counters["tokens_per_sec_p50"] = round(statistics.median(token_rates), 1)
+        if self.cache is not None:
+            counters["cache"] = self.cache.stats()
+        return counters
+
+    def parse_request(self, body, headers=None):
+        """Split a demo's JSON body into ``(model, generateContent request, bypass)``.
+
+        Besides the request fields the body may carry ``model``,
+        ``deterministic: true`` to apply DETERMINISTIC_CONFIG, and
+        ``cache: false`` (or a ``Cache-Control: no-cache`` header) to bypass
+        the cache.
+        """
+        payload = json.loads(body or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("body must be a JSON object")
+        model = payload.get("model") or DEFAULT_MODEL
+        if not isinstance(model, str) or not _MODEL.fullmatch(model):
+            raise ValueError("invalid model name")
+        contents = payload.get("contents")
+        if not contents:
+            raise ValueError("contents is required")
+        if not isinstance(contents, list) or not all(isinstance(content, dict) for content in contents):
+            raise ValueError("contents must be a list of objects")
+        # cache_key and cacheable read these, so they must have the API's shape.
+        for content in contents:
+            parts = content.get("parts", [])
+            if not isinstance(parts, list) or not all(isinstance(part, dict) for part in parts):
+                raise ValueError("parts must be a list of objects")
+            if not all(isinstance(part.get("text", ""), str) for part in parts):
+                raise ValueError("a part's text must be a string")
+        if not isinstance(payload.get("generationConfig", {}), dict):
+            raise ValueError("generationConfig must be an object")
+        request = {field: payload[field] for field in _REQUEST_FIELDS if field in payload}
+        if payload.get("deterministic"):
+            request["generationConfig"] = dict(request.get("generationConfig", {}), **DETERMINISTIC_CONFIG)
+        bypass = payload.get("cache") is False or "no-cache" in (headers or {}).get("Cache-Control", "")
+        return model, request, bypass
+
+    def handle_generate(self, body, headers, query):
+        """Asset-server route: ``POST /gemini/generate``.
+
+        The body is a ``generateContent`` request (see ``parse_request``);
+        the reply is the API's status and JSON, unchanged, or the cached
+        JSON of an identical deterministic request.
+        """
+        model, request, bypass = self.parse_request(body, headers)
+        if not self.key:
+            return 503, api_error(503, "GEMINI_API_KEY is not set on the server", "FAILED_PRECONDITION")
+        key, reply = self.lookup(model, request, bypass)
+        if reply is not None:
+            return 200, reply
+        return self.generate_shared(model, request, key or cache_key(model, request), store=key is not None)
+
+    def handle_stream(self, body, headers, query):
+        """Asset-server route: ``POST /gemini/stream``, the reply as server-sent events.
+
+        A cached reply is sent as a single event.
+        """
+        model, request, bypass = self.parse_request(body, headers)
+        if not self.key:
+            return 503, api_error(503, "GEMINI_API_KEY is not set on the server", "FAILED_PRECONDITION")
+        key, reply = self.lookup(model, request, bypass)
+        if reply is not None:
+            return 200, self._replay(reply)
+        return self.stream_shared(model, request, key or cache_key(model, request), store_as=key)
+
+    def handle_status(self, body, headers, query):
+        """Asset-server route: ``GET /gemini/status``."""
+        return 200, self.stats()
+
+
+@st.cache_resource(show_spinner=False)
+def gemini_proxy():
+    """The process-wide proxy, reachable under ``/gemini``."""
+    proxy = GeminiProxy(cache=ResponseCache())
+    register_route("POST", "/gemini/generate", proxy.handle_generate)
+    register_route("POST", "/gemini/stream", proxy.handle_stream)
+    register_route("GET", "/gemini/status", proxy.handle_status, public=True)
+    return proxy
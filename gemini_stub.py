@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ROUTE = re.compile(r"/v1beta/models/([A-Za-z0-9._-]+):(generateContent|streamGenerateContent)")
+_WORDS = ("the model answers with plain words so that latency and throughput can be measured "
+          "without a network connection or an API quota and every prompt always gets the same "
+          "reply of the requested length").split()
+
+
+def reply_text(prompt, tokens):
+    """A deterministic reply of ``tokens`` words, seeded by the prompt."""
+    seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_WORDS) for _ in range(tokens)).capitalize() + "."
+
+
+def prompt_text(request):
+    return " ".join(part.get("text", "") for content in request.get("contents", [])
+                    for part in content.get("parts", []))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers ``generateContent`` the way the Gemini API does, after a delay.
+
+    The delay is ``latency_ms`` plus ``token_ms`` per output token, and a
+    share of requests fail with 429 or 503, as configured on the server.
+    Requests without an API key (``x-goog-api-key`` header or ``key``
+    parameter) are refused with 403. ``streamGenerateContent?alt=sse``
+    sends the reply as server-sent events of ``chunk_tokens`` tokens each,
+    the first after ``latency_ms``; a client that hangs up mid-stream is
+    counted in ``server.cancelled``.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "GeminiStub/1.0"
+    # Headers and body go out in separate writes; without this, delayed
+    # ACKs add ~40 ms to every response on a kept-alive connection.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path, _, query = self.path.partition("?")
+        match = _ROUTE.fullmatch(path)
+        if match is None:
+            self._send_error(404, "NOT_FOUND", f"unknown method {path}")
+            return
+        if not self.headers.get("x-goog-api-key") and "key=" not in query:
+            self._send_error(403, "PERMISSION_DENIED", "Method doesn't allow unregistered callers.")
+            return
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._send_error(400, "INVALID_ARGUMENT", "Invalid JSON payload received.")
+            return
+        config = self.server.config
+        self.server.count()
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            self._send_error(429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota).")
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._send_error(503, "UNAVAILABLE", "The model is overloaded. Please try again later.")
+            return
+
+        prompt = prompt_text(request)
+        max_tokens = request.get("generationConfig", {}).get("maxOutputTokens", 2048)
+        tokens = min(max_tokens, config.tokens)
+        finish = "STOP" if tokens < max_tokens else "MAX_TOKENS"
+        if match.group(2) == "streamGenerateContent":
+            self._stream(match.group(1), prompt, tokens, finish)
+            return
+        time.sleep((config.latency_ms + config.token_ms * tokens) / 1000)
+        self._send_json(200, _response(match.group(1), prompt, reply_text(prompt, tokens), tokens, finish))
+
+    def _stream(self, model, prompt, tokens, finish):
+        config = self.server.config
+        words = reply_text(prompt, tokens).split(" ")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(config.latency_ms / 1000)
+        try:
+            for start in range(0, len(words), config.chunk_tokens):
+                part = words[start:start + config.chunk_tokens]
+                time.sleep(config.token_ms * len(part) / 1000)
+                text = (" " if start else "") + " ".join(part)
+                last = start + config.chunk_tokens >= len(words)
+                event = _response(model, prompt, text, start + len(part), finish if last else None)
+                data = b"data: " + json.dumps(event).encode("utf-8") + b"\r\n\r\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count(cancelled=True)
+            self.close_connection = True
+
+    def _send_error(self, status, reason, message):
+        self._send_json(status, {"error": {"code": status, "message": message, "status": reason}})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _response(model, prompt, text, tokens, finish):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = finish
+    prompt_tokens = len(prompt.split())
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": tokens,
+            "totalTokenCount": prompt_tokens + tokens,
+        },
+        "modelVersion": model,
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, config):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.requests = 0
+        self.cancelled = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def count(self, cancelled=False):
+        with self._lock:
+            if cancelled:
+                self.cancelled += 1
+            else:
+                self.requests += 1
+
+
+def start_stub(host="127.0.0.1", port=0, latency_ms=200, token_ms=0, tokens=200, rate_limit_rate=0.0,
+               error_rate=0.0, chunk_tokens=8):
+    """Serve the stub from a daemon thread; return the server (``server.server_port`` is the port)."""
+    config = argparse.Namespace(latency_ms=latency_ms, token_ms=token_ms, tokens=tokens,
+                                rate_limit_rate=rate_limit_rate, error_rate=error_rate, chunk_tokens=chunk_tokens)
+    server = StubServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="gemini-stub", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=200, help="fixed delay per request")
+    parser.add_argument("--token-ms", type=float, default=0, help="extra delay per output token")
+    parser.add_argument("--tokens", type=int, default=200, help="output tokens per reply")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--chunk-tokens", type=int, default=8, help="tokens per streamed event")
+    args = parser.parse_args(argv)
+    server = start_stub(args.host, args.port, args.latency_ms, args.token_ms, args.tokens,
+                        args.rate_limit_rate, args.error_rate, args.chunk_tokens)
+    print(f"Gemini stub on http://{args.host}:{server.server_port}/v1beta "
+          f"(set GEMINI_API_BASE to use it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import streamlit as st
+
+from asset_server import register_route
+
+TTS_CACHE_DIR = Path(os.environ.get("DEMO_TTS_CACHE_DIR", Path(__file__).parent / "tts_cache"))
+DEFAULT_VOICE = "en-us"
+# espeak's default speed in words per minute, taken as a browser rate of 1.
+BASE_WPM = 175
+
+_VOICE = re.compile(r"[A-Za-z0-9_+-]{1,32}")
+_pyttsx3_lock = threading.Lock()
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+def cache_key(text, voice, rate):
+    """Hex digest naming the audio for ``(text, voice, rate)``."""
+    return hashlib.sha256(json.dumps([normalize_text(text), voice, round(rate, 2)]).encode("utf-8")).hexdigest()
+
+
+def _espeak(executable):
+    def render(text, voice, rate, path):
+        subprocess.run([executable, "-v", voice, "-s", str(round(BASE_WPM * rate)), "-w", str(path), "--stdin"],
+                       input=text.encode("utf-8"), capture_output=True, check=True, timeout=60)
+    return render
+
+
+def _pyttsx3(text, voice, rate, path):
+    import pyttsx3
+
+    # The engine is a process-wide singleton and not thread-safe.
+    with _pyttsx3_lock:
+        engine = pyttsx3.init()
+        engine.setProperty("rate", round(BASE_WPM * rate))
+        for candidate in engine.getProperty("voices"):
+            if voice in candidate.id.lower():
+                engine.setProperty("voice", candidate.id)
+                break
+        engine.save_to_file(text, str(path))
+        engine.runAndWait()
+
+
+def find_engine():
+    """Return ``(name, render)`` for the first offline engine installed, or ``(None, None)``.
+
+    ``render(text, voice, rate, path)`` writes a WAV file to ``path``.
+    """
+    for name in ("espeak-ng", "espeak"):
+        executable = shutil.which(name)
+        if executable:
+            return name, _espeak(executable)
+    if importlib.util.find_spec("pyttsx3"):
+        return "pyttsx3", _pyttsx3
+    return None, None
+
+
+class AudioCache:
+    """Files named by key, evicted least recently used first past ``max_bytes``.
+
+    Recency is kept in an OrderedDict and mirrored into each file's mtime,
+    so the order survives a restart.
+    """
+
+    def __init__(self, root, max_bytes=256 * 1024 * 1024, suffix=".wav"):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        for leftover in self.root.glob("*.tmp"):
+            leftover.unlink(missing_ok=True)
+        files = sorted(((path.stat(), path) for path in self.root.glob(f"*{suffix}")),
+                       key=lambda entry: entry[0].st_mtime)
+        for stat, path in files:
+            self._entries[path.stem] = stat.st_size
+            self.bytes += stat.st_size
+        self._evict()
+
+    def path(self, key):
+        return self.root / f"{key}{self.suffix}"
+
+    def get(self, key):
+        """The cached file for ``key``, marked as just used, or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.bytes -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def put(self, key, source):
+        """Move the file ``source`` into the cache as ``key``; return its new path."""
+        path = self.path(key)
+        size = os.path.getsize(source)
+        os.replace(source, path)
+        with self._lock:
+            self.bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return path
+
+    def _evict(self):
+        # The newest entry stays even if it alone is over the limit.
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            self.path(key).unlink(missing_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class OfflineSpeech:
+    """Render speech with an offline engine, through an LRU disk cache.
+
+    Audio is keyed by a hash of the normalized text, voice and rate, so a
+    kiosk repeating the same prompts renders each once and then serves it
+    straight from disk. Rendering runs on the request thread; the engine
+    is a separate process (espeak-ng) or holds its own lock (pyttsx3).
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=256 * 1024 * 1024, engine=None):
+        self.engine, self._render = engine or find_engine()
+        self.cache = AudioCache(cache_dir, max_bytes)
+        self._lock = threading.Lock()
+        self._render_times = deque(maxlen=500)
+        self._hit_times = deque(maxlen=500)
+        self.requests = 0
+        self.hits = 0
+        self.failed = 0
+
+    def speak(self, text, voice=DEFAULT_VOICE, rate=1.0):
+        """Return ``(path, hit, ms)`` for the audio of ``text``.
+
+        Raises ValueError for bad arguments and RuntimeError when no
+        engine is installed or rendering fails.
+        """
+        start = time.perf_counter()
+        text = normalize_text(text)
+        voice = voice.lower()
+        if not text:
+            raise ValueError("nothing to say")
+        if not _VOICE.fullmatch(voice):
+            raise ValueError("invalid voice")
+        if not 0.25 <= rate <= 4:
+            raise ValueError("rate must be between 0.25 and 4")
+        key = cache_key(text, voice, rate)
+        path = self.cache.get(key)
+        hit = path is not None
+        if not hit:
+            if self._render is None:
+                raise RuntimeError("no offline speech engine installed (espeak-ng or pyttsx3)")
+            temporary = self.cache.root / f"{key}.{threading.get_ident()}.tmp"
+            try:
+                self._render(text, voice, rate, temporary)
+                path = self.cache.put(key, temporary)
+            except (OSError, subprocess.SubprocessError) as exc:
+                temporary.unlink(missing_ok=True)
+                with self._lock:
+                    self.requests += 1
+                    self.failed += 1
+                raise RuntimeError(f"{self.engine} failed: {exc}") from exc
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.requests += 1
+            if hit:
+                self.hits += 1
+            (self._hit_times if hit else self._render_times).append(elapsed)
+        return path, hit, elapsed
+
+    def stats(self):
+        with self._lock:
+            render_times = sorted(self._render_times)
+            hit_times = sorted(self._hit_times)
+            counters = {
+                "engine": self.engine,
+                "requests": self.requests,
+                "hits": self.hits,
+                "failed": self.failed,
+                "hit_rate": round(self.hits / self.requests, 3) if self.requests else 0.0,
+                "cached_files": len(self.cache),
+                "cached_mb": round(self.cache.bytes / 1048576, 1),
+                "evictions": self.cache.evictions,
+            }
+        if render_times:
+            counters["render_p50_ms"] = round(statistics.median(render_times), 1)
+            counters["render_p95_ms"] = round(render_times[int(0.95 * (len(render_times) - 1))], 1)
+        if hit_times:
+            counters["hit_p50_ms"] = round(statistics.median(hit_times), 2)
+        return counters
+
+    def handle_speak(self, body, headers, query):
+        """Asset-server route: ``GET /tts?text=&voice=&rate=``, the WAV file."""
+        try:
+            path, _, _ = self.speak(query.get("text", ""), query.get("voice", DEFAULT_VOICE),
+                                    float(query.get("rate", 1)))
+        except RuntimeError as exc:
+            return 503, {"error": str(exc)}
+        return 200, path
+
+    def handle_stats(self, body, headers, query):
+        """Asset-server route: ``GET /tts/stats``."""
+        return 200, self.stats()
+
+
+@st.cache_resource(show_spinner=False)
+def offline_speech():
+    """The process-wide offline TTS service, reachable under ``/tts``."""
+    speech = OfflineSpeech()
+    register_route("GET", "/tts", speech.handle_speak)
+    register_route("GET", "/tts/stats", speech.handle_stats, public=True)
+    return speech
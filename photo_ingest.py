@@ -0,0 +1,188 @@
+import io
+import itertools
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import streamlit as st
+
+from asset_server import register_route
+
+# Longest edge of each thumbnail generated per frame, largest first.
+THUMBNAIL_SIZES = (960, 320, 96)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProcessedFrame:
+    """A decoded capture with its JPEG thumbnails keyed by longest edge."""
+    id: int
+    session: str
+    width: int
+    height: int
+    format: str
+    size: int
+    thumbnails: dict
+    latency_ms: float
+
+
+class PhotoIngestor:
+    """Decode uploaded frames off the request thread and queue the results.
+
+    Frames are decoded with PIL in a thread pool (PIL releases the GIL while
+    decoding and resizing), turned into thumbnails and put on a bounded
+    per-session queue the app drains. When a queue is full the oldest frame
+    is dropped; when more than ``max_backlog`` frames are waiting to be
+    decoded, new uploads are refused so memory stays bounded. A session's
+    queue is thrown away once nothing was added to or drained from it for
+    ``idle_timeout`` seconds, as when its page was closed.
+    """
+
+    def __init__(self, workers=4, queue_size=64, max_backlog=256, thumbnail_sizes=THUMBNAIL_SIZES,
+                 idle_timeout=300):
+        self.thumbnail_sizes = tuple(sorted(thumbnail_sizes, reverse=True))
+        self.queue_size = queue_size
+        self.max_backlog = max_backlog
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photo-ingest")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._used_at = {}
+        self._latencies = deque(maxlen=1000)
+        self._finished_at = deque(maxlen=1000)
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.expired = 0
+
+    @property
+    def backlog(self):
+        return self.received - self.processed - self.failed
+
+    def submit(self, data, session=""):
+        """Queue raw image bytes for decoding; return the frame id, or None if busy."""
+        with self._lock:
+            if self.backlog >= self.max_backlog:
+                self.rejected += 1
+                return None
+            self.received += 1
+        frame_id = next(self._ids)
+        self._executor.submit(self._process, frame_id, session, data, time.perf_counter())
+        return frame_id
+
+    def _decode(self, data):
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as image:
+            width, height, image_format = image.width, image.height, image.format
+            # JPEG can be decoded straight at a reduced scale; a no-op otherwise.
+            image.draft("RGB", (self.thumbnail_sizes[0], self.thumbnail_sizes[0]))
+            image.load()
+            thumbnails = {}
+            # Each size is downscaled from the previous, larger one.
+            source = image.convert("RGB")
+            for edge in self.thumbnail_sizes:
+                source.thumbnail((edge, edge))
+                buffer = io.BytesIO()
+                source.save(buffer, "JPEG", quality=85)
+                thumbnails[edge] = buffer.getvalue()
+        return width, height, image_format, thumbnails
+
+    def _process(self, frame_id, session, data, received_at):
+        from PIL import Image
+
+        processed = False
+        try:
+            width, height, image_format, thumbnails = self._decode(data)
+            finished_at = time.perf_counter()
+            frame = ProcessedFrame(frame_id, session, width, height, image_format, len(data),
+                                   thumbnails, (finished_at - received_at) * 1000)
+            with self._lock:
+                self.processed += 1
+                processed = True
+                self._latencies.append(frame.latency_ms)
+                self._finished_at.append(finished_at)
+                self._expire_idle(time.monotonic())
+                frames = self._queues.setdefault(session, deque(maxlen=self.queue_size))
+                self._used_at[session] = time.monotonic()
+                if len(frames) == frames.maxlen:
+                    self.dropped += 1
+                frames.append(frame)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            pass
+        except Exception:
+            logger.exception("frame %s could not be processed", frame_id)
+        finally:
+            # Every frame is counted as processed or failed, or the backlog
+            # would never drain and uploads would be refused for good.
+            if not processed:
+                with self._lock:
+                    self.failed += 1
+
+    def _expire_idle(self, now):
+        # Called with self._lock held.
+        for session, used_at in list(self._used_at.items()):
+            if now - used_at > self.idle_timeout:
+                del self._used_at[session]
+                self._queues.pop(session, None)
+                self.expired += 1
+
+    def drain(self, session):
+        """Return and remove every processed frame waiting for ``session``."""
+        with self._lock:
+            if session in self._used_at:
+                self._used_at[session] = time.monotonic()
+            frames = self._queues.get(session)
+            drained = list(frames) if frames else []
+            if frames:
+                frames.clear()
+        return drained
+
+    def stats(self):
+        """Counters plus throughput (frames/s) and latency over recent frames."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            finished = list(self._finished_at)
+            counters = {
+                "received": self.received,
+                "processed": self.processed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "backlog": self.backlog,
+            }
+        span = finished[-1] - finished[0] if len(finished) > 1 else 0
+        counters["frames_per_sec"] = round((len(finished) - 1) / span, 1) if span else 0.0
+        if latencies:
+            counters["latency_p50_ms"] = round(statistics.median(latencies), 1)
+            counters["latency_p95_ms"] = round(latencies[int(0.95 * (len(latencies) - 1))], 1)
+        return counters
+
+    def handle_upload(self, body, headers, query):
+        """Asset-server route: ``POST /photos`` with the encoded image as body."""
+        if not body:
+            raise ValueError("empty upload")
+        frame_id = self.submit(body, headers.get("X-Demo-Session", ""))
+        if frame_id is None:
+            return 503, {"error": "ingestion backlog full"}
+        return 202, {"id": frame_id}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@st.cache_resource(show_spinner=False)
+def photo_ingestor():
+    """The process-wide ingestor, reachable at ``POST /photos``."""
+    ingestor = PhotoIngestor()
+    register_route("POST", "/photos", ingestor.handle_upload)
+    return ingestor
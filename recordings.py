@@ -0,0 +1,206 @@
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import streamlit as st
+
+from asset_server import register_route
+
+RECORDINGS_DIR = Path(os.environ.get("DEMO_RECORDINGS_DIR", Path(__file__).parent / "recordings"))
+
+_RECORDING_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+_EXTENSIONS = {"video/webm": ".webm", "video/mp4": ".mp4", "video/x-matroska": ".mkv"}
+
+
+@dataclass
+class Recording:
+    """A recording being streamed to disk, one chunk at a time."""
+    id: str
+    session: str
+    mime_type: str
+    path: Path
+    size: int = 0
+    chunks: int = 0
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    finished_at: float = None
+    discarded: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+
+class RecordingStore:
+    """Append MediaRecorder chunks to disk as the browser sends them.
+
+    Each chunk is posted with the byte offset it starts at and is written
+    only if that matches the size on disk; otherwise the reply carries the
+    current size, so a client whose request failed halfway can resume from
+    there without duplicating or losing bytes. Nothing is buffered beyond
+    the chunk being written. When more than ``max_inflight_bytes`` are
+    being written at once, or ``max_active`` recordings are open, uploads
+    are refused with 503 and the client retries later. Callables in
+    ``on_finish`` are called with each recording once its last chunk is in.
+    A recording that gets no chunk for ``idle_timeout`` seconds and was
+    never finished (the tab closed mid-recording) is dropped with its
+    ``.part`` file, so abandoned recordings do not hold slots forever. Only
+    the ``history`` most recently finished recordings are remembered; the
+    files of older ones stay on disk.
+    """
+
+    def __init__(self, root=RECORDINGS_DIR, max_active=4, max_inflight_bytes=16 * 1024 * 1024, idle_timeout=300,
+                 history=100):
+        self.root = Path(root)
+        self.max_active = max_active
+        self.max_inflight_bytes = max_inflight_bytes
+        self.idle_timeout = idle_timeout
+        self.history = history
+        self._lock = threading.Lock()
+        self._recordings = {}
+        self._inflight = 0
+        self.refused = 0
+        self.expired = 0
+        self.on_finish = []
+
+    def _recording_id(self, query):
+        recording_id = query.get("id", "")
+        if not _RECORDING_ID.fullmatch(recording_id):
+            raise ValueError("invalid recording id")
+        return recording_id
+
+    def _discard(self, recording):
+        # Called with self._lock and recording.lock held. A request already
+        # waiting on recording.lock sees the flag and leaves the file alone.
+        del self._recordings[recording.id]
+        recording.discarded = True
+        recording.path.unlink(missing_ok=True)
+
+    def _expire_idle(self, now):
+        # Called with self._lock held; a recording busy writing is not idle.
+        for recording in list(self._recordings.values()):
+            if recording.finished or now - recording.updated_at <= self.idle_timeout:
+                continue
+            if recording.lock.acquire(blocking=False):
+                try:
+                    self._discard(recording)
+                    self.expired += 1
+                finally:
+                    recording.lock.release()
+
+    def _open(self, recording_id, session, mime_type):
+        with self._lock:
+            recording = self._recordings.get(recording_id)
+            if recording is not None:
+                return recording
+            self._expire_idle(time.time())
+            active = sum(not recording.finished for recording in self._recordings.values())
+            if active >= self.max_active:
+                return None
+            mime_type = mime_type.split(";", 1)[0].strip() or "video/webm"
+            self.root.mkdir(parents=True, exist_ok=True)
+            path = self.root / f"{recording_id}{_EXTENSIONS.get(mime_type, '.bin')}.part"
+            path.write_bytes(b"")
+            recording = self._recordings[recording_id] = Recording(recording_id, session, mime_type, path)
+            return recording
+
+    def handle_chunk(self, body, headers, query):
+        """Asset-server route: ``POST /recordings?id=<id>&offset=<bytes>``."""
+        recording_id = self._recording_id(query)
+        offset = int(query.get("offset", "0"))
+        with self._lock:
+            if self._inflight + len(body) > self.max_inflight_bytes:
+                self.refused += 1
+                return 503, {"error": "too many bytes in flight", "retry_after_ms": 500}
+            self._inflight += len(body)
+        try:
+            recording = self._open(recording_id, headers.get("X-Demo-Session", ""),
+                                   headers.get("Content-Type", ""))
+            if recording is None:
+                self.refused += 1
+                return 503, {"error": "too many active recordings", "retry_after_ms": 2000}
+            with recording.lock:
+                if recording.discarded:
+                    return 404, {"error": "recording was discarded", "offset": 0}
+                if recording.finished:
+                    return 409, {"error": "recording already finished", "offset": recording.size}
+                if offset != recording.size:
+                    return 409, {"error": "offset mismatch", "offset": recording.size}
+                with open(recording.path, "ab") as file:
+                    file.write(body)
+                recording.size += len(body)
+                recording.chunks += 1
+                recording.updated_at = time.time()
+                return 200, {"offset": recording.size}
+        finally:
+            with self._lock:
+                self._inflight -= len(body)
+
+    def handle_status(self, body, headers, query):
+        """Asset-server route: ``GET /recordings?id=<id>``, the offset to resume from."""
+        recording = self._recordings.get(self._recording_id(query))
+        if recording is None:
+            return 404, {"error": "unknown recording", "offset": 0}
+        return 200, {"offset": recording.size, "finished": recording.finished}
+
+    def handle_finish(self, body, headers, query):
+        """Asset-server route: ``POST /recordings/finish?id=<id>``."""
+        recording = self._recordings.get(self._recording_id(query))
+        if recording is None:
+            return 404, {"error": "unknown recording"}
+        with recording.lock:
+            if recording.discarded:
+                return 404, {"error": "recording was discarded"}
+            just_finished = not recording.finished
+            if just_finished:
+                final_path = recording.path.with_suffix("")
+                recording.path.replace(final_path)
+                recording.path = final_path
+                recording.finished_at = time.time()
+        if just_finished:
+            with self._lock:
+                finished = [key for key, other in self._recordings.items() if other.finished]
+                for key in finished[:max(0, len(finished) - self.history)]:
+                    del self._recordings[key]
+            for callback in self.on_finish:
+                callback(recording)
+        return 200, {"id": recording.id, "size": recording.size, "chunks": recording.chunks,
+                     "file": recording.path.name}
+
+    def handle_abort(self, body, headers, query):
+        """Asset-server route: ``POST /recordings/abort?id=<id>``, discard an unfinished recording.
+
+        Sent as a beacon when the page goes away mid-recording.
+        """
+        recording_id = self._recording_id(query)
+        with self._lock:
+            recording = self._recordings.get(recording_id)
+            if recording is None:
+                return 404, {"error": "unknown recording"}
+            with recording.lock:
+                if recording.finished:
+                    return 409, {"error": "recording already finished"}
+                self._discard(recording)
+        return 200, {"id": recording_id, "aborted": True}
+
+    def recordings(self, session=None):
+        """Finished recordings, oldest first, optionally for one page session."""
+        with self._lock:
+            recordings = list(self._recordings.values())
+        return [recording for recording in recordings
+                if recording.finished and session in (None, recording.session)]
+
+
+@st.cache_resource(show_spinner=False)
+def recording_store():
+    """The process-wide store, reachable under ``/recordings``."""
+    store = RecordingStore()
+    register_route("POST", "/recordings", store.handle_chunk)
+    register_route("GET", "/recordings", store.handle_status, public=True)
+    register_route("POST", "/recordings/finish", store.handle_finish)
+    register_route("POST", "/recordings/abort", store.handle_abort)
+    return store
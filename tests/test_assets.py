@@ -0,0 +1,59 @@
+from assets import minify_css, minify_html, minify_js, shake_js
+
+
+def test_minify_js_keeps_comment_markers_inside_literals():
+    js = """
+        const pattern = /\\/*[/]*/g;  // trailing comment
+        const text = "a /* b */ c";
+        // a whole-line comment
+        const template = `first
+            // stays, it is part of the string
+            ${ {value: 1}.value /* inside */ } last`;
+        const ratio = 10 / 2 / 1; /* block
+        comment */ done();
+    """
+    assert minify_js(js) == "\n".join([
+        "const pattern = /\\/*[/]*/g;",
+        'const text = "a /* b */ c";',
+        "const template = `first",
+        "            // stays, it is part of the string",
+        "            ${ {value: 1}.value /* inside */ } last`;",
+        "const ratio = 10 / 2 / 1;",
+        "done();",
+    ])
+
+
+def test_minify_html_only_strips_html_comments_in_markup():
+    html = """
+        <!-- note -->
+        <style>
+            /* theme */
+            .a { color: red; }
+        </style>
+        <p>// not a comment</p>
+        <script>
+            const marker = "<!-- kept -->";
+        </script>
+    """
+    assert minify_html(html) == "\n".join([
+        "<style>", ".a { color: red; }", "</style>",
+        "<p>// not a comment</p>",
+        "<script>", 'const marker = "<!-- kept -->";', "</script>",
+    ])
+    assert minify_css("/* a */\n  p {}\n\n") == "p {}"
+
+
+def test_shake_js_finds_indented_declarations_and_ignores_literals():
+    js = """
+    function used() { return helper(); }
+    const helper = () => 1;
+    const source = `
+function inTemplate() {}
+`;
+    class Unused {
+        method() { const local = 1; }
+    }
+    """
+    kept = shake_js(js, "<script>used()</script>")
+    assert "function used" in kept and "const helper" in kept
+    assert "Unused" not in kept and "source" not in kept
@@ -0,0 +1,25 @@
+import pytest
+
+from gemini_batch import parse_prompts
+
+
+def test_csv_uses_prompt_and_id_columns():
+    rows = parse_prompts("id,prompt\na,Hello\nb,World\n", "csv")
+    assert [(row["row"], row["id"]) for row in rows] == [(0, "a"), (1, "b")]
+    assert rows[1]["request"] == {"contents": [{"parts": [{"text": "World"}]}]}
+
+
+def test_csv_skips_short_and_blank_rows():
+    rows = parse_prompts("id,prompt\n1\n2,  \n3,Hi\n", "csv")
+    assert [(row["row"], row["id"]) for row in rows] == [(0, "3")]
+
+
+def test_jsonl_reports_bad_line():
+    with pytest.raises(ValueError, match="line 2"):
+        parse_prompts('{"prompt": "a"}\nnot json\n', "jsonl")
+
+
+@pytest.mark.parametrize("line", ["3", '"contents"', '["contents"]', "null"])
+def test_jsonl_rejects_non_objects(line):
+    with pytest.raises(ValueError, match="line 1 is not an object"):
+        parse_prompts(line + "\n", "jsonl")
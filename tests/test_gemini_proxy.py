@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from gemini_proxy import GeminiProxy, ResponseCache, cache_key, cacheable
+
+
+def body(**fields):
+    return json.dumps(dict({"contents": [{"parts": [{"text": "hi"}]}]}, **fields)).encode("utf-8")
+
+
+def test_cache_key_collapses_prompt_whitespace():
+    plain = {"contents": [{"parts": [{"text": "what is  pi?"}]}]}
+    spaced = {"contents": [{"parts": [{"text": " what is\npi? "}]}]}
+    assert cache_key("m", plain) == cache_key("m", spaced)
+    assert cache_key("m", plain) != cache_key("other", plain)
+    assert cache_key("m", plain) != cache_key("m", dict(plain, generationConfig={"temperature": 0}))
+
+
+def test_only_greedy_requests_are_cacheable():
+    assert cacheable({"generationConfig": {"temperature": 0}})
+    assert not cacheable({"generationConfig": {"temperature": 0.7}})
+    assert not cacheable({})
+
+
+def test_parse_request_applies_deterministic_config():
+    model, request, bypass = GeminiProxy("http://x", "k").parse_request(body(deterministic=True, cache=False))
+    assert request["generationConfig"]["temperature"] == 0
+    assert bypass
+
+
+@pytest.mark.parametrize("payload", [
+    b"[]",
+    body(contents=[]),
+    body(contents="hi"),
+    body(contents=[{"parts": "hi"}]),
+    body(contents=[{"parts": [{"text": 3}]}]),
+    body(generationConfig=[0]),
+    body(model="../keys"),
+    body(model=3),
+])
+def test_parse_request_rejects_malformed_bodies(payload):
+    with pytest.raises(ValueError):
+        GeminiProxy("http://x", "k").parse_request(payload)
+
+
+def test_cache_keeps_recent_entries_in_memory_and_the_rest_on_disk(tmp_path):
+    cache = ResponseCache(tmp_path, max_entries=2)
+    for key in ("aa1", "bb2", "cc3"):
+        cache.put(key, {"key": key})
+    assert cache.get("cc3") == {"key": "cc3"}
+    assert cache.get("aa1") == {"key": "aa1"}
+    assert cache.get("zz9") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["memory_entries"] == 2
+
+
+def test_cache_expires_entries_after_ttl(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.put("aa1", {"old": True})
+    stale = time.time() - 120
+    os.utime(cache.path("aa1"), (stale, stale))
+    cache._memory.clear()
+    assert cache.get("aa1") is None
+    assert not cache.path("aa1").exists()
+    assert cache.stats()["expired"] == 1
+
+
+def test_cache_survives_a_restart_and_drops_stale_files(tmp_path):
+    ResponseCache(tmp_path).put("aa1", {"kept": True})
+    ResponseCache(tmp_path).put("bb2", {"kept": False})
+    stale = time.time() - 7200
+    os.utime(ResponseCache(tmp_path).path("bb2"), (stale, stale))
+    cache = ResponseCache(tmp_path, ttl=3600)
+    assert cache.get("aa1") == {"kept": True}
+    assert not cache.path("bb2").exists()
+
+
+class SlowProxy(GeminiProxy):
+    """A proxy whose upstream call waits for ``release`` and can be made to fail."""
+
+    def __init__(self, error=None, **kwargs):
+        super().__init__("http://upstream.invalid", "k", **kwargs)
+        self.release = threading.Event()
+        self.calls = 0
+        self.error = error
+
+    def generate(self, model, request):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return 200, {"answer": request["contents"][0]["parts"][0]["text"]}
+
+
+def run_concurrently(proxy, count):
+    results = [None] * count
+    errors = []
+
+    def call(index):
+        try:
+            results[index] = proxy.generate_shared("m", {"contents": [{"parts": [{"text": "q"}]}]}, "key")
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while proxy.coalesced < count - 1 and time.time() < deadline:
+        time.sleep(0.01)
+    proxy.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_identical_requests_in_flight_share_one_upstream_call():
+    proxy = SlowProxy()
+    results, errors = run_concurrently(proxy, 8)
+    assert not errors
+    assert proxy.calls == 1
+    assert proxy.coalesced == 7
+    assert results == [(200, {"answer": "q"})] * 8
+    assert not proxy._flights
+
+
+def test_a_failing_leader_releases_its_followers_with_an_error():
+    proxy = SlowProxy(error=RuntimeError("boom"))
+    results, errors = run_concurrently(proxy, 4)
+    assert len(errors) == 1
+    assert [result[0] for result in results if result] == [502] * 3
+    assert not proxy._flights
+
+
+def test_a_failed_cache_write_does_not_fail_the_leader(tmp_path):
+    class BrokenCache(ResponseCache):
+        def put(self, key, payload):
+            raise OSError("disk full")
+
+    proxy = SlowProxy(cache=BrokenCache(tmp_path))
+    proxy.release.set()
+    assert proxy.generate_shared("m", {"contents": [{"parts": [{"text": "q"}]}]}, "key", store=True)[0] == 200
+
+
+def test_a_closing_stream_is_not_joined():
+    proxy = GeminiProxy("http://x", "k")
+    flight, leader = proxy._join("key")
+    assert leader
+    assert proxy._join("key") == (flight, False)
+    flight.closing = True
+    fresh, leader = proxy._join("key")
+    assert leader and fresh is not flight
+    proxy._land("key", flight)
+    assert proxy._flights["key"] is fresh
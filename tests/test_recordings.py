@@ -0,0 +1,96 @@
+import pytest
+
+from recordings import RecordingStore
+
+HEADERS = {"X-Demo-Session": "s1", "Content-Type": "video/webm;codecs=vp8"}
+
+
+def chunk(store, data, offset, recording_id="r1"):
+    return store.handle_chunk(data, HEADERS, {"id": recording_id, "offset": str(offset)})
+
+
+def test_chunks_append_at_the_expected_offset(tmp_path):
+    store = RecordingStore(tmp_path)
+    assert chunk(store, b"abc", 0) == (200, {"offset": 3})
+    assert chunk(store, b"def", 3) == (200, {"offset": 6})
+    assert (tmp_path / "r1.webm.part").read_bytes() == b"abcdef"
+
+
+def test_a_retried_or_skipped_chunk_gets_the_offset_to_resume_from(tmp_path):
+    store = RecordingStore(tmp_path)
+    chunk(store, b"abc", 0)
+    # The reply to the first upload was lost and the client sends it again.
+    assert chunk(store, b"abc", 0) == (409, {"error": "offset mismatch", "offset": 3})
+    assert chunk(store, b"ghi", 9)[0] == 409
+    assert store.handle_status(b"", {}, {"id": "r1"}) == (200, {"offset": 3, "finished": False})
+    assert chunk(store, b"def", 3) == (200, {"offset": 6})
+    assert (tmp_path / "r1.webm.part").read_bytes() == b"abcdef"
+
+
+def test_finish_renames_the_file_and_notifies(tmp_path):
+    store = RecordingStore(tmp_path)
+    finished = []
+    store.on_finish.append(finished.append)
+    chunk(store, b"abc", 0)
+    status, payload = store.handle_finish(b"", {}, {"id": "r1"})
+    assert (status, payload["file"], payload["size"]) == (200, "r1.webm", 3)
+    assert (tmp_path / "r1.webm").read_bytes() == b"abc"
+    assert [recording.id for recording in finished] == ["r1"]
+    # Finishing twice is harmless and does not notify again.
+    assert store.handle_finish(b"", {}, {"id": "r1"})[0] == 200
+    assert len(finished) == 1
+    assert chunk(store, b"def", 3)[0] == 409
+    assert [recording.session for recording in store.recordings("s1")] == ["s1"]
+    assert store.handle_abort(b"", {}, {"id": "r1"})[0] == 409
+
+
+def test_abort_drops_the_partial_file(tmp_path):
+    store = RecordingStore(tmp_path)
+    chunk(store, b"abc", 0)
+    assert store.handle_abort(b"", {}, {"id": "r1"}) == (200, {"id": "r1", "aborted": True})
+    assert not (tmp_path / "r1.webm.part").exists()
+    assert store.handle_status(b"", {}, {"id": "r1"})[0] == 404
+    assert store.handle_finish(b"", {}, {"id": "r1"})[0] == 404
+    assert store.recordings() == []
+
+
+def test_a_chunk_waiting_on_a_discarded_recording_writes_nothing(tmp_path):
+    store = RecordingStore(tmp_path)
+    chunk(store, b"abc", 0)
+    recording = store._recordings["r1"]
+    with store._lock:
+        store._discard(recording)
+    store._recordings["r1"] = recording
+    assert chunk(store, b"def", 3)[0] == 404
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_idle_recordings_give_up_their_slot(tmp_path):
+    store = RecordingStore(tmp_path, max_active=1, idle_timeout=60)
+    chunk(store, b"abc", 0, "r1")
+    assert chunk(store, b"abc", 0, "r2")[0] == 503
+    store._recordings["r1"].updated_at -= 120
+    assert chunk(store, b"abc", 0, "r2") == (200, {"offset": 3})
+    assert store.expired == 1
+    assert not (tmp_path / "r1.webm.part").exists()
+
+
+def test_too_many_bytes_in_flight_are_refused(tmp_path):
+    store = RecordingStore(tmp_path, max_inflight_bytes=2)
+    assert chunk(store, b"abc", 0)[0] == 503
+    assert store.refused == 1
+
+
+def test_only_the_latest_finished_recordings_are_remembered(tmp_path):
+    store = RecordingStore(tmp_path, history=2)
+    for recording_id in ("r1", "r2", "r3"):
+        chunk(store, b"abc", 0, recording_id)
+        store.handle_finish(b"", {}, {"id": recording_id})
+    assert [recording.id for recording in store.recordings()] == ["r2", "r3"]
+    assert (tmp_path / "r1.webm").exists()
+
+
+@pytest.mark.parametrize("recording_id", ["", "../etc", "a" * 65])
+def test_invalid_ids_are_rejected(tmp_path, recording_id):
+    with pytest.raises(ValueError):
+        chunk(RecordingStore(tmp_path), b"abc", 0, recording_id)
@@ -0,0 +1,62 @@
+import pytest
+
+from transcripts import TranscriptStore, tokenize
+
+
+def segments(*texts):
+    return [{"text": text, "time": 1000 * index} for index, text in enumerate(texts)]
+
+
+def texts(hits):
+    return [hit["text"] for hit in hits]
+
+
+def test_tokenize_keeps_inner_apostrophes():
+    assert tokenize("Don't STOP, it's 'fine'_now") == ["don't", "stop", "it's", "fine", "now"]
+
+
+def test_search_intersects_words_newest_first(tmp_path):
+    store = TranscriptStore(tmp_path)
+    assert store.append("s1", segments("the red fox", "a red car", "", "the quick red fox")) == 3
+    total, hits = store.search("red fox")
+    assert (total, texts(hits)) == (2, ["the quick red fox", "the red fox"])
+    assert hits[0]["session"] == "s1" and hits[0]["time"] == 3.0
+    assert texts(store.search("RED")[1]) == ["the quick red fox", "a red car", "the red fox"]
+    assert store.search("red zebra") == (0, [])
+    assert store.search("  ") == (0, [])
+
+
+def test_search_counts_every_match_but_reads_only_the_limit(tmp_path):
+    store = TranscriptStore(tmp_path)
+    store.append("s1", segments(*[f"line {index}" for index in range(30)]))
+    total, hits = store.search("line", limit=5)
+    assert total == 30
+    assert texts(hits) == [f"line {index}" for index in range(29, 24, -1)]
+
+
+def test_search_can_be_limited_to_a_session(tmp_path):
+    store = TranscriptStore(tmp_path)
+    store.append("s1", segments("hello from one"))
+    store.append("s2", segments("hello from two"))
+    assert texts(store.search("hello", session="s2")[1]) == ["hello from two"]
+    assert store.search("hello", session="s3") == (0, [])
+
+
+def test_index_is_rebuilt_and_a_torn_last_line_dropped(tmp_path):
+    store = TranscriptStore(tmp_path)
+    store.append("s1", segments("first words", "second words"))
+    store._log.close()
+    with open(store.path, "ab") as file:
+        file.write(b'{"session": "s1", "text": "cut o')
+    store = TranscriptStore(tmp_path)
+    assert texts(store.search("words")[1]) == ["second words", "first words"]
+    store.append("s1", segments("third words"))
+    assert texts(store.search("words")[1]) == ["third words", "second words", "first words"]
+    assert store.stats()["segments"] == 3
+    assert store.path.read_bytes().count(b"\n") == 3
+
+
+@pytest.mark.parametrize("body", [b"[]", b'{"segments": ["text"]}', b'{"segments": {}}'])
+def test_handle_append_rejects_non_objects(tmp_path, body):
+    with pytest.raises(ValueError):
+        TranscriptStore(tmp_path).handle_append(body, {}, {})
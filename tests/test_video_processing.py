@@ -0,0 +1,78 @@
+import struct
+
+from video_processing import (BLOCK_GROUP, BLOCK, CLUSTER, CODEC_ID, DURATION, INFO, PIXEL_HEIGHT, PIXEL_WIDTH,
+                              SEGMENT, SIMPLE_BLOCK, TIMECODE, TIMECODE_SCALE, TRACK_ENTRY, TRACK_NUMBER,
+                              TRACK_TYPE, TRACKS, VIDEO, parse_webm)
+
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def element(element_id, payload=b"", unknown_size=False):
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    size = UNKNOWN_SIZE if unknown_size else b"\x01" + len(payload).to_bytes(7, "big")
+    return id_bytes + size + payload
+
+
+def uint(element_id, value):
+    return element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def simple_block(track, relative_ms, keyframe):
+    return element(SIMPLE_BLOCK, bytes([0x80 | track]) + struct.pack(">hB", relative_ms, 0x80 if keyframe else 0)
+                   + b"frame")
+
+
+def cluster(timecode, *blocks):
+    return element(CLUSTER, uint(TIMECODE, timecode) + b"".join(blocks), unknown_size=True)
+
+
+def recording(duration=None):
+    info = uint(TIMECODE_SCALE, 1_000_000)
+    if duration is not None:
+        info += element(DURATION, struct.pack(">d", duration))
+    video = element(TRACK_ENTRY, uint(TRACK_NUMBER, 1) + uint(TRACK_TYPE, 1) + element(CODEC_ID, b"V_VP8")
+                    + element(VIDEO, uint(PIXEL_WIDTH, 640) + uint(PIXEL_HEIGHT, 480)))
+    audio = element(TRACK_ENTRY, uint(TRACK_NUMBER, 2) + uint(TRACK_TYPE, 2) + element(CODEC_ID, b"A_OPUS"))
+    header = element(0x1A45DFA3, uint(0x4282, 0) + element(0x4282, b"webm"))
+    body = (element(INFO, info) + element(TRACKS, video + audio)
+            + cluster(0, simple_block(1, 0, True), simple_block(2, 0, True), simple_block(1, 33, False))
+            + cluster(1000, simple_block(1, 0, True), simple_block(1, 33, False), simple_block(2, 40, True)))
+    return header + element(SEGMENT, body, unknown_size=True)
+
+
+def test_tracks_and_keyframes_come_from_the_container():
+    info = parse_webm(recording(duration=1040.0))
+    assert [track["codec"] for track in info.tracks] == ["V_VP8", "A_OPUS"]
+    assert info.video_track == {"number": 1, "type": 1, "codec": "V_VP8", "width": 640, "height": 480}
+    assert info.clusters == 2
+    assert info.blocks == 6
+    # Audio blocks are flagged as keyframes too, but only video ones count.
+    assert info.keyframes_ms == [0.0, 1000.0]
+    assert info.duration_ms == 1040.0
+
+
+def test_duration_falls_back_to_block_timestamps():
+    # MediaRecorder leaves the Duration out while it is still recording.
+    assert parse_webm(recording()).duration_ms == 1040.0
+
+
+def test_block_groups_count_but_are_never_keyframes():
+    group = element(BLOCK_GROUP, element(BLOCK, b"\x81" + struct.pack(">hB", 0, 0x80) + b"frame"))
+    data = element(SEGMENT, element(TRACKS, element(TRACK_ENTRY, uint(TRACK_NUMBER, 1) + uint(TRACK_TYPE, 1)))
+                   + cluster(500, group), unknown_size=True)
+    info = parse_webm(data)
+    assert (info.blocks, info.keyframes_ms, info.duration_ms) == (1, [], 0.0)
+
+
+def test_a_truncated_recording_ends_the_walk():
+    data = recording()
+    for cut in (len(data) - 3, len(data) // 2, 10, 0):
+        info = parse_webm(data[:cut])
+        assert info.blocks <= 6
+    assert parse_webm(data[:-3]).keyframes_ms == [0.0, 1000.0]
+    assert parse_webm(data[:-3]).blocks == 5
+
+
+def test_garbage_yields_an_empty_result():
+    info = parse_webm(b"\x00\x00\x00\x00")
+    assert (info.tracks, info.clusters, info.blocks) == ([], 0, 0)
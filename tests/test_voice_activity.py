@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from voice_activity import SAMPLE_RATE, AudioIngestor, VoiceActivityDetector
+
+rng = np.random.default_rng(0)
+
+
+def silence(seconds):
+    return rng.normal(0, 20, int(SAMPLE_RATE * seconds))
+
+
+def tone(seconds, frequency=220):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return 8000 * np.sin(2 * np.pi * frequency * t)
+
+
+def pcm(*parts):
+    return np.concatenate(parts).astype("<i2").tobytes()
+
+
+def segment(pcm_bytes, chunk_bytes=None, **options):
+    detector = VoiceActivityDetector(**options)
+    chunk_bytes = chunk_bytes or len(pcm_bytes)
+    utterances = []
+    for start in range(0, len(pcm_bytes), chunk_bytes):
+        utterances += detector.process(pcm_bytes[start:start + chunk_bytes])
+    last = detector.flush()
+    return detector, utterances + ([last] if last is not None else [])
+
+
+def test_speech_between_silences_splits_into_padded_utterances():
+    detector, utterances = segment(pcm(silence(1), tone(0.5), silence(1), tone(0.3), silence(1)))
+    assert len(utterances) == 2
+    # Each utterance keeps 200 ms of padding on either side.
+    assert [len(utterance) / SAMPLE_RATE for utterance in utterances] == pytest.approx([0.9, 0.7], abs=0.04)
+    assert detector.trimmed_ratio == pytest.approx(1 - 1.6 / 3.8, abs=0.02)
+
+
+def test_a_short_pause_does_not_split_an_utterance():
+    _, utterances = segment(pcm(silence(1), tone(0.3), silence(0.2), tone(0.3), silence(1)))
+    assert len(utterances) == 1
+
+
+def test_clicks_are_dropped():
+    _, utterances = segment(pcm(silence(1), tone(0.06), silence(1)))
+    assert utterances == []
+
+
+def test_chunking_does_not_change_the_result():
+    audio = pcm(silence(1), tone(0.5), silence(1), tone(0.3), silence(0.3))
+    _, whole = segment(audio)
+    # Odd-sized chunks split both frames and samples.
+    _, chunked = segment(audio, chunk_bytes=1000)
+    assert [len(utterance) for utterance in chunked] == [len(utterance) for utterance in whole]
+
+
+def test_speech_still_open_at_the_end_is_flushed():
+    detector = VoiceActivityDetector()
+    assert detector.process(pcm(silence(0.5), tone(0.5))) == []
+    assert detector.flush() is not None
+    assert detector.flush() is None
+
+
+def test_ingestor_refuses_a_split_sample(tmp_path):
+    ingestor = AudioIngestor(tmp_path)
+    with pytest.raises(ValueError):
+        ingestor.handle_chunk(b"abc", {}, {"id": "a1", "offset": "0"})
+
+
+def test_ingestor_saves_utterances_and_resumes_at_its_offset(tmp_path):
+    ingestor = AudioIngestor(tmp_path)
+    audio = pcm(silence(1), tone(0.5), silence(1))
+    status, stats = ingestor.handle_chunk(audio, {"X-Demo-Session": "s1"}, {"id": "a1", "offset": "0"})
+    assert status == 200
+    assert ingestor.handle_chunk(audio, {}, {"id": "a1", "offset": "0"})[1]["offset"] == len(audio)
+    assert ingestor.handle_finish(b"", {}, {"id": "a1"})[0] == 200
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a1-0001.wav"]
+    assert ingestor.handle_chunk(audio, {}, {"id": "a1", "offset": str(len(audio))})[0] == 409
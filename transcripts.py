@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import threading
+import time
+from array import array
+from pathlib import Path
+
+import streamlit as st
+
+from asset_server import register_route
+
+TRANSCRIPTS_DIR = Path(os.environ.get("DEMO_TRANSCRIPTS_DIR", Path(__file__).parent / "transcripts"))
+
+_TOKEN = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+
+def tokenize(text):
+    """Lower-cased words, keeping inner apostrophes ("don't")."""
+    return _TOKEN.findall(text.lower())
+
+
+class TranscriptStore:
+    """An append-only log of final transcript segments with a word index.
+
+    Segments are written as one JSON object per line to ``segments.jsonl``
+    and never rewritten. In memory there is only the byte offset of each
+    line, its session, and an inverted index from word to the ids of the
+    segments containing it; both grow by appending as segments arrive, so
+    adding a segment costs the same however large the log is. Searching
+    intersects the posting lists of the query words, rarest first, and
+    reads just the matching lines back from the log. The index is rebuilt
+    from the log on start-up; a last line cut off by a crash is skipped.
+    """
+
+    def __init__(self, root=TRANSCRIPTS_DIR):
+        self.root = Path(root)
+        self.path = self.root / "segments.jsonl"
+        self._lock = threading.Lock()
+        self._offsets = array("q")
+        self._sessions = array("I")
+        self._session_ids = {}
+        self._postings = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load()
+        self._log = open(self.path, "ab")
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as file:
+            offset = 0
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self._index(json.loads(line), offset)
+                except ValueError:
+                    pass
+                offset += len(line)
+        # Drop a partial last line, so new lines start cleanly.
+        if offset != self.path.stat().st_size:
+            os.truncate(self.path, offset)
+
+    def _index(self, segment, offset):
+        segment_id = len(self._offsets)
+        self._offsets.append(offset)
+        session = segment["session"]
+        if session not in self._session_ids:
+            self._session_ids[session] = len(self._session_ids)
+        self._sessions.append(self._session_ids[session])
+        for word in set(tokenize(segment["text"])):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array("I")
+            postings.append(segment_id)
+
+    def append(self, session, segments):
+        """Log and index ``segments`` (dicts with text, time, confidence); return how many."""
+        received_at = time.time()
+        records = []
+        for segment in segments:
+            text = str(segment.get("text", "")).strip()
+            if not text:
+                continue
+            confidence = segment.get("confidence")
+            records.append({
+                "session": session,
+                "time": float(segment.get("time") or received_at * 1000) / 1000,
+                "received_at": round(received_at, 3),
+                "confidence": None if confidence is None else round(float(confidence), 4),
+                "text": text,
+            })
+        with self._lock:
+            offset = self._log.tell()
+            lines = []
+            for record in records:
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                self._index(record, offset)
+                offset += len(line)
+                lines.append(line)
+            self._log.write(b"".join(lines))
+            self._log.flush()
+        return len(records)
+
+    def _read(self, segment_id):
+        start = self._offsets[segment_id]
+        end = self._offsets[segment_id + 1] if segment_id + 1 < len(self._offsets) else None
+        with open(self.path, "rb") as file:
+            file.seek(start)
+            line = file.read(end - start) if end is not None else file.readline()
+        return json.loads(line)
+
+    def search(self, query, limit=20, session=None):
+        """Segments containing every word of ``query``, newest first.
+
+        Returns ``(total, segments)``; only the first ``limit`` are read
+        from the log.
+        """
+        import numpy as np
+
+        words = set(tokenize(query))
+        if not words:
+            return 0, []
+        with self._lock:
+            postings = [self._postings.get(word) for word in words]
+            if not all(postings):
+                return 0, []
+            postings.sort(key=len)
+            # Views into the arrays must not outlive the lock: an array
+            # cannot grow while a buffer of it is exported.
+            matches = np.frombuffer(postings[0], dtype=np.uint32).copy()
+            for other in postings[1:]:
+                if not len(matches):
+                    break
+                matches = np.intersect1d(matches, np.frombuffer(other, dtype=np.uint32), assume_unique=True)
+            if session is not None:
+                session_id = self._session_ids.get(session, -1)
+                matches = matches[np.frombuffer(self._sessions, dtype=np.uint32)[matches] == session_id]
+            self._log.flush()
+            hits = [self._read(int(segment_id)) for segment_id in matches[::-1][:limit]]
+        return len(matches), hits
+
+    def stats(self):
+        with self._lock:
+            return {
+                "segments": len(self._offsets),
+                "sessions": len(self._session_ids),
+                "words": len(self._postings),
+                "log_bytes": self._log.tell(),
+            }
+
+    def handle_append(self, body, headers, query):
+        """Asset-server route: ``POST /transcripts`` with ``{"segments": [...]}``.
+
+        Beacons cannot set headers, so the session may also come as ``?session=``.
+        """
+        session = headers.get("X-Demo-Session") or query.get("session", "")
+        payload = json.loads(body or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("body must be a JSON object")
+        segments = payload.get("segments", [])
+        if not isinstance(segments, list) or not all(isinstance(segment, dict) for segment in segments):
+            raise ValueError("segments must be a list of objects")
+        return 200, {"stored": self.append(session, segments)}
+
+    def handle_search(self, body, headers, query):
+        """Asset-server route: ``GET /transcripts/search?q=<words>&limit=<n>``."""
+        start = time.perf_counter()
+        total, hits = self.search(query.get("q", ""), int(query.get("limit", 20)), query.get("session"))
+        return 200, {"total": total, "segments": hits, "ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+@st.cache_resource(show_spinner=False)
+def transcript_store():
+    """The process-wide transcript log, reachable under ``/transcripts``."""
+    store = TranscriptStore()
+    register_route("POST", "/transcripts", store.handle_append)
+    register_route("GET", "/transcripts/search", store.handle_search, public=True)
+    return store
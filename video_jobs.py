@@ -0,0 +1,184 @@
+import itertools
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import streamlit as st
+
+from asset_server import register_route
+from recordings import RECORDINGS_DIR, recording_store
+from video_processing import Cancelled, process_recording
+
+
+@dataclass
+class VideoJob:
+    """One recording going through the post-processing pool."""
+    id: int
+    session: str
+    path: Path
+    submitted_at: float = field(default_factory=time.time)
+    status: str = "queued"
+    started_at: float = None
+    finished_at: float = None
+    result: dict = None
+    error: str = None
+    future: object = field(default=None, repr=False)
+
+    @property
+    def queue_ms(self):
+        return (self.started_at - self.submitted_at) * 1000 if self.started_at else None
+
+    @property
+    def run_ms(self):
+        return (self.finished_at - self.started_at) * 1000 if self.started_at and self.finished_at else None
+
+
+class VideoJobQueue:
+    """Post-process finished recordings in a pool of worker processes.
+
+    Parsing the container and decoding keyframes is CPU-bound, so it runs in
+    separate processes, one per core by default, and never on the Streamlit
+    script thread. At most ``max_pending`` jobs are queued or running;
+    further recordings are refused and counted as rejected. Cancelling a
+    session drops its queued jobs and tells its running ones to stop
+    through a flag file the worker checks between frames.
+    """
+
+    def __init__(self, out_dir=RECORDINGS_DIR, workers=None, max_pending=8, history=100):
+        self.out_dir = Path(out_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.history = history
+        # Spawned rather than forked: the app process is full of server threads.
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._run_times = deque(maxlen=200)
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    @property
+    def pending(self):
+        return sum(job.finished_at is None for job in self._jobs.values())
+
+    def _sprite_path(self, job):
+        return self.out_dir / f"{job.path.name}.sprite.jpg"
+
+    def _cancel_path(self, job):
+        return self.out_dir / f".cancel-{job.id}"
+
+    def submit(self, path, session=""):
+        """Queue ``path`` for processing; return the job, or None if the queue is full."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                return None
+            job = VideoJob(next(self._ids), session, Path(path))
+            # Submitted before the job is published, so cancel_session never
+            # finds a job without its future.
+            job.future = self._executor.submit(process_recording, str(job.path),
+                                               str(self._sprite_path(job)), str(self._cancel_path(job)))
+            self._jobs[job.id] = job
+        # Outside the lock: a future that is already done runs _finish here.
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def _finish(self, job, future):
+        finished_at = time.time()
+        result = error = None
+        try:
+            result = future.result()
+            status = "done"
+        except (CancelledError, Cancelled):
+            status = "cancelled"
+        except Exception as exc:  # anything raised in the worker, or a crashed worker
+            status, error = "failed", f"{type(exc).__name__}: {exc}"
+        self._cancel_path(job).unlink(missing_ok=True)
+
+        with self._lock:
+            job.status, job.result, job.error = status, result, error
+            job.started_at = result["started_at"] if result else job.started_at
+            job.finished_at = finished_at
+            if status == "done":
+                self.completed += 1
+                self._run_times.append(job.run_ms)
+            elif status == "cancelled":
+                self.cancelled += 1
+            else:
+                self.failed += 1
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished_at]
+            for job_id in finished[:max(0, len(finished) - self.history)]:
+                del self._jobs[job_id]
+
+    def cancel_session(self, session):
+        """Cancel every unfinished job of ``session``; return how many there were."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values()
+                    if job.session == session and job.finished_at is None]
+        for job in jobs:
+            if not job.future.cancel():
+                self._cancel_path(job).touch()
+        return len(jobs)
+
+    def jobs(self, session=None):
+        """Jobs still known to the queue, oldest first, optionally for one session.
+
+        A queued job the pool has handed to a worker is reported as running,
+        with the time that was first seen as its start until the worker's
+        own start time arrives with its result.
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if session in (None, job.session)]
+            for job in jobs:
+                if job.status == "queued" and job.future.running():
+                    job.status, job.started_at = "running", time.time()
+            return jobs
+
+    def stats(self):
+        with self._lock:
+            run_times = sorted(self._run_times)
+            counters = {
+                "workers": self.workers,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "rejected": self.rejected,
+            }
+        if run_times:
+            counters["run_p50_ms"] = round(statistics.median(run_times), 1)
+            counters["run_p95_ms"] = round(run_times[int(0.95 * (len(run_times) - 1))], 1)
+        return counters
+
+    def handle_cancel(self, body, headers, query):
+        """Asset-server route: ``POST /video-jobs/cancel?session=<id>``.
+
+        Demos send it with ``navigator.sendBeacon`` when the page goes away.
+        """
+        session = query.get("session")
+        if not session:
+            raise ValueError("missing session")
+        return 200, {"cancelled": self.cancel_session(session)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@st.cache_resource(show_spinner=False)
+def video_jobs():
+    """The process-wide job queue, fed with every recording the store finishes."""
+    jobs = VideoJobQueue()
+    recording_store().on_finish.append(lambda recording: jobs.submit(recording.path, recording.session))
+    register_route("POST", "/video-jobs/cancel", jobs.handle_cancel)
+    return jobs
@@ -0,0 +1,257 @@
+import io
+import mmap
+import os
+import shutil
+import struct
+import subprocess
+import time
+from dataclasses import dataclass, field
+
+# Matroska/WebM element IDs, with their length marker bits.
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+TIMECODE = 0xE7
+SIMPLE_BLOCK = 0xA3
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+
+# Elements whose children are walked; every other element is skipped whole.
+_CONTAINERS = {SEGMENT, INFO, TRACKS, TRACK_ENTRY, VIDEO, CLUSTER, BLOCK_GROUP}
+_UINTS = {TIMECODE_SCALE, TRACK_NUMBER, TRACK_TYPE, PIXEL_WIDTH, PIXEL_HEIGHT, TIMECODE}
+
+
+class Cancelled(Exception):
+    """Raised inside a worker when its job was cancelled."""
+
+
+@dataclass
+class WebmInfo:
+    """What the container says about a recording, without decoding it."""
+    duration_ms: float = 0.0
+    tracks: list = field(default_factory=list)
+    keyframes_ms: list = field(default_factory=list)
+    clusters: int = 0
+    blocks: int = 0
+
+    @property
+    def video_track(self):
+        return next((track for track in self.tracks if track.get("type") == 1), {})
+
+
+def _read_id(data, pos):
+    first = data[pos]
+    if first == 0:
+        raise ValueError(f"invalid element ID at byte {pos}")
+    length = 8 - first.bit_length() + 1
+    return int.from_bytes(data[pos:pos + length], "big"), length
+
+
+def _read_size(data, pos):
+    """Return ``(size, length)``; size is None for the "unknown" marker."""
+    first = data[pos]
+    if first == 0:
+        raise ValueError(f"invalid element size at byte {pos}")
+    length = 8 - first.bit_length() + 1
+    value = first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    unknown = value == (1 << (7 * length)) - 1
+    return (None if unknown else value), length
+
+
+def parse_webm(data):
+    """Walk the EBML tree of a WebM file and collect durations and keyframes.
+
+    MediaRecorder writes the Segment and its Clusters with unknown sizes, so
+    containers are not skipped by size but walked element by element; any
+    element that is not a container is skipped. A truncated last element,
+    as in a recording that was cut off, just ends the walk.
+    """
+    info = WebmInfo()
+    scale_ns = 1_000_000
+    track = None
+    video_number = None
+    cluster_ms = 0
+    last_ms = first_ms = None
+    pos, end = 0, len(data)
+    while pos < end:
+        try:
+            element, id_length = _read_id(data, pos)
+            size, size_length = _read_size(data, pos + id_length)
+        except (IndexError, ValueError):
+            break
+        start = pos + id_length + size_length
+        if element in _CONTAINERS:
+            if element == TRACK_ENTRY:
+                track = {}
+                info.tracks.append(track)
+            elif element == CLUSTER:
+                info.clusters += 1
+            pos = start
+            continue
+        if size is None or start + size > end:
+            break
+        pos = start + size
+        payload = data[start:pos]
+
+        if element in _UINTS:
+            value = int.from_bytes(payload, "big")
+            if element == TIMECODE_SCALE:
+                scale_ns = value
+            elif element == TIMECODE:
+                cluster_ms = value * scale_ns / 1e6
+            elif track is not None:
+                key = {TRACK_NUMBER: "number", TRACK_TYPE: "type",
+                       PIXEL_WIDTH: "width", PIXEL_HEIGHT: "height"}[element]
+                track[key] = value
+        elif element == CODEC_ID and track is not None:
+            track["codec"] = payload.decode("ascii", "replace").rstrip("\x00")
+        elif element == DURATION:
+            duration = struct.unpack(">f" if size == 4 else ">d", payload)[0]
+            info.duration_ms = duration * scale_ns / 1e6
+        elif element in (SIMPLE_BLOCK, BLOCK):
+            number, number_length = _read_size(payload, 0)
+            relative = int.from_bytes(payload[number_length:number_length + 2], "big", signed=True)
+            flags = payload[number_length + 2]
+            timestamp = cluster_ms + relative * scale_ns / 1e6
+            info.blocks += 1
+            if video_number is None:
+                video_number = info.video_track.get("number", -1)
+            first_ms = timestamp if first_ms is None else min(first_ms, timestamp)
+            last_ms = timestamp if last_ms is None else max(last_ms, timestamp)
+            # Only SimpleBlocks carry a keyframe flag; MediaRecorder uses nothing else.
+            if element == SIMPLE_BLOCK and flags & 0x80 and number == video_number:
+                info.keyframes_ms.append(timestamp)
+
+    if not info.duration_ms and last_ms is not None:
+        info.duration_ms = last_ms - first_ms
+    return info
+
+
+def _read_ppm(stream):
+    """Read one binary PPM frame from ``stream``; None at the end."""
+    header = []
+    while len(header) < 4:
+        line = stream.readline()
+        if not line:
+            return None
+        header.extend(line.split())
+    width, height = int(header[1]), int(header[2])
+    pixels = stream.read(width * height * 3)
+    if len(pixels) < width * height * 3:
+        return None
+    return width, height, pixels
+
+
+def keyframe_images(path, width, is_cancelled, keyframes=0, max_frames=25):
+    """Decode only the keyframes of ``path`` with ffmpeg, scaled to ``width``.
+
+    Of the ``keyframes`` the container lists, at most ``max_frames`` evenly
+    spaced ones are kept; the others are read off the pipe and dropped, so
+    memory stays bounded however long the recording. With no count, the
+    first ``max_frames`` are kept. Returns an empty list when ffmpeg is not
+    installed.
+    """
+    from PIL import Image
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return []
+    command = [ffmpeg, "-v", "error", "-skip_frame", "nokey", "-i", str(path), "-an",
+               "-fps_mode", "passthrough", "-vf", f"scale={width}:-2", "-f", "image2pipe",
+               "-c:v", "ppm", "-"]
+    step = max(keyframes / max_frames, 1)
+    wanted = sorted({int(index * step) for index in range(max_frames)})
+    images = []
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+        try:
+            index = 0
+            while len(images) < len(wanted) and (frame := _read_ppm(proc.stdout)) is not None:
+                if is_cancelled():
+                    raise Cancelled()
+                if index == wanted[len(images)]:
+                    images.append(Image.frombytes("RGB", frame[:2], frame[2]))
+                index += 1
+        finally:
+            proc.kill()
+    return images
+
+
+def sprite_sheet(images, columns=5):
+    """Tile equally sized ``images`` into one grid image."""
+    from PIL import Image
+
+    width, height = images[0].size
+    rows = -(-len(images) // columns)
+    sheet = Image.new("RGB", (width * min(columns, len(images)), height * rows))
+    for index, image in enumerate(images):
+        sheet.paste(image, ((index % columns) * width, (index // columns) * height))
+    return sheet
+
+
+def process_recording(path, sprite_path, cancel_path, max_frames=25, thumb_width=160):
+    """Worker entry point: container stats plus a keyframe sprite sheet.
+
+    Checks for ``cancel_path`` between stages and between decoded frames,
+    and raises ``Cancelled`` once it exists. Returns a JSON-able dict with
+    the timing of each stage.
+    """
+    started_at = time.time()
+    timings = {}
+
+    def is_cancelled():
+        return os.path.exists(cancel_path)
+
+    def stage(name, begin):
+        timings[f"{name}_ms"] = round((time.perf_counter() - begin) * 1000, 1)
+        if is_cancelled():
+            raise Cancelled()
+
+    begin = time.perf_counter()
+    info = WebmInfo()
+    if os.path.getsize(path):
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            info = parse_webm(data)
+    stage("parse", begin)
+
+    begin = time.perf_counter()
+    images = keyframe_images(path, thumb_width, is_cancelled, len(info.keyframes_ms), max_frames)
+    stage("decode", begin)
+
+    sprite = None
+    if images:
+        begin = time.perf_counter()
+        buffer = io.BytesIO()
+        sprite_sheet(images).save(buffer, "JPEG", quality=80)
+        with open(sprite_path, "wb") as file:
+            file.write(buffer.getvalue())
+        sprite = str(sprite_path)
+        stage("sprite", begin)
+
+    video = info.video_track
+    return {
+        "started_at": started_at,
+        "duration_s": round(info.duration_ms / 1000, 2),
+        "keyframes": len(info.keyframes_ms),
+        "keyframe_times_s": [round(ms / 1000, 2) for ms in info.keyframes_ms],
+        "clusters": info.clusters,
+        "blocks": info.blocks,
+        "codecs": [track.get("codec") for track in info.tracks],
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "sprite": sprite,
+        "sprite_frames": len(images),
+        "timings": timings,
+        "pid": os.getpid(),
+    }
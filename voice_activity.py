@@ -0,0 +1,306 @@
+import os
+import re
+import threading
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import streamlit as st
+
+from asset_server import register_route
+
+AUDIO_DIR = Path(os.environ.get("DEMO_AUDIO_DIR", Path(__file__).parent / "audio"))
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+
+_STREAM_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def frame_features(samples, frame_length):
+    """Energy (dBFS) and zero-crossing rate of each whole frame of int16 ``samples``."""
+    import numpy as np
+
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32) / 32768
+    frames -= frames.mean(axis=1, keepdims=True)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+    return energy_db, zcr
+
+
+def speech_mask(energy_db, zcr, noise_floor_db, margin_db=10.0, fricative_zcr=0.25):
+    """Which frames hold speech.
+
+    Voiced sounds stand well above the noise floor; unvoiced consonants
+    ("s", "f") are quieter but cross zero far more often, so they count
+    at half the margin when their zero-crossing rate is high.
+    """
+    loud = energy_db > noise_floor_db + margin_db
+    hiss = (energy_db > noise_floor_db + margin_db / 2) & (zcr > fricative_zcr)
+    return loud | hiss
+
+
+def _tail(frames, count):
+    return frames[max(0, len(frames) - count):] if count else frames[:0]
+
+
+class VoiceActivityDetector:
+    """Split a stream of 16 kHz PCM into utterances, dropping the silence.
+
+    Audio is cut into 20 ms frames and each chunk is classified at once
+    with ``frame_features``/``speech_mask`` against a noise floor that
+    follows the quietest frames and creeps up slowly, so a louder room
+    is picked up within seconds. Only runs of speech and silence are
+    walked in Python. An utterance ends after ``min_silence_ms`` without
+    speech; ``padding_ms`` of silence is kept on each side so words are
+    not clipped, and utterances with less than ``min_speech_ms`` of speech
+    are dropped as clicks and bumps.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, min_silence_ms=400, padding_ms=200,
+                 min_speech_ms=120, margin_db=10.0, floor_rise_db_per_s=1.0, min_floor_db=-70.0):
+        import numpy as np
+
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.min_silence = min_silence_ms // frame_ms
+        self.padding = padding_ms // frame_ms
+        self.min_speech = min_speech_ms // frame_ms
+        self.margin_db = margin_db
+        self.floor_rise_db = floor_rise_db_per_s * frame_ms / 1000
+        self.min_floor_db = min_floor_db
+        self.noise_floor_db = None
+        empty = np.zeros((0, self.frame_length), np.int16)
+        self._leftover = np.zeros(0, np.int16)
+        self._preroll = empty
+        self._utterance = []
+        self._silence = []
+        self._silence_frames = 0
+        self._speech_frames = 0
+        self.frames = 0
+        self.speech_frames = 0
+        self.kept_frames = 0
+        self.seconds = 0.0
+
+    @property
+    def trimmed_ratio(self):
+        return 1 - self.kept_frames / self.frames if self.frames else 0.0
+
+    @property
+    def frames_per_sec(self):
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    def process(self, pcm):
+        """Feed little-endian int16 PCM; return the utterances it completed."""
+        import numpy as np
+
+        start = time.perf_counter()
+        samples = np.concatenate([self._leftover, np.frombuffer(pcm, "<i2", len(pcm) // 2)])
+        count = len(samples) // self.frame_length
+        self._leftover = samples[count * self.frame_length:]
+        utterances = []
+        if count:
+            frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+            energy_db, zcr = frame_features(samples, self.frame_length)
+            quietest = float(energy_db.min())
+            floor = quietest if self.noise_floor_db is None else self.noise_floor_db + self.floor_rise_db * count
+            self.noise_floor_db = max(self.min_floor_db, min(floor, quietest))
+            mask = speech_mask(energy_db, zcr, self.noise_floor_db, self.margin_db)
+            self.frames += count
+            self.speech_frames += int(np.count_nonzero(mask))
+            boundaries = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+            for begin, end in zip(np.r_[0, boundaries], np.r_[boundaries, count]):
+                utterance = self._run(frames[begin:end], bool(mask[begin]))
+                if utterance is not None:
+                    utterances.append(utterance)
+        self.seconds += time.perf_counter() - start
+        return utterances
+
+    def flush(self):
+        """End the stream; return the utterance in progress, if any."""
+        return self._close() if self._utterance else None
+
+    def _run(self, frames, speech):
+        import numpy as np
+
+        if speech:
+            if self._utterance:
+                # The pause was too short to split on.
+                self._utterance.extend(self._silence)
+            else:
+                self._utterance = [self._preroll]
+            self._silence = []
+            self._silence_frames = 0
+            self._utterance.append(frames)
+            self._speech_frames += len(frames)
+        elif self._utterance:
+            self._silence.append(frames)
+            self._silence_frames += len(frames)
+            if self._silence_frames >= self.min_silence:
+                return self._close()
+        else:
+            self._preroll = _tail(np.concatenate([self._preroll, frames]), self.padding)
+        return None
+
+    def _close(self):
+        import numpy as np
+
+        silence = np.concatenate(self._silence) if self._silence else self._preroll[:0]
+        utterance = None
+        if self._speech_frames >= self.min_speech:
+            frames = np.concatenate(self._utterance + [silence[:self.padding]])
+            self.kept_frames += len(frames)
+            utterance = frames.ravel()
+        self._preroll = _tail(silence, self.padding)
+        self._utterance = []
+        self._silence = []
+        self._silence_frames = 0
+        self._speech_frames = 0
+        return utterance
+
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes(samples.astype("<i2").tobytes())
+
+
+@dataclass
+class AudioStream:
+    """Raw audio arriving from one capture, and the utterances kept from it."""
+    id: str
+    session: str
+    detector: VoiceActivityDetector
+    offset: int = 0
+    utterances: list = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    finished_at: float = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def stats(self):
+        detector = self.detector
+        return {
+            "offset": self.offset,
+            "seconds": round(detector.frames * FRAME_MS / 1000, 1),
+            "frames": detector.frames,
+            "speech_frames": detector.speech_frames,
+            "utterances": len(self.utterances),
+            "trimmed_ratio": round(detector.trimmed_ratio, 3),
+            "frames_per_sec": round(detector.frames_per_sec),
+            "noise_floor_db": None if detector.noise_floor_db is None else round(detector.noise_floor_db, 1),
+        }
+
+
+class AudioIngestor:
+    """Receive raw 16 kHz PCM from the speech demo and keep only the speech.
+
+    Chunks are posted with the byte offset they start at, as recordings
+    are (see ``RecordingStore``), and run through a
+    ``VoiceActivityDetector`` as they arrive. Silence is never written
+    anywhere: each utterance is saved as its own WAV file, ready for a
+    recognizer, and the reply to every chunk carries the frames/s of the
+    detector and the share of audio trimmed so far. A stream that gets no
+    chunk for ``idle_timeout`` seconds and was never finished (the tab
+    closed mid-capture) is finished by the server, keeping the utterances
+    saved so far, so abandoned streams do not hold slots forever. Only the
+    ``history`` most recent finished streams are remembered.
+    """
+
+    def __init__(self, root=AUDIO_DIR, max_active=8, idle_timeout=300, history=100):
+        self.root = Path(root)
+        self.max_active = max_active
+        self.idle_timeout = idle_timeout
+        self.history = history
+        self._lock = threading.Lock()
+        self._streams = {}
+        self.expired = 0
+
+    def _stream_id(self, query):
+        stream_id = query.get("id", "")
+        if not _STREAM_ID.fullmatch(stream_id):
+            raise ValueError("invalid stream id")
+        return stream_id
+
+    def _finish(self, stream):
+        # Called with stream.lock held.
+        if stream.finished_at is None:
+            last = stream.detector.flush()
+            self._save(stream, [last] if last is not None else [])
+            stream.finished_at = time.time()
+
+    def _expire_idle(self, now):
+        # Called with self._lock held; a stream busy with a chunk is not idle.
+        for stream in self._streams.values():
+            if stream.finished_at is not None or now - stream.updated_at <= self.idle_timeout:
+                continue
+            if stream.lock.acquire(blocking=False):
+                try:
+                    self._finish(stream)
+                    self.expired += 1
+                finally:
+                    stream.lock.release()
+
+    def _open(self, stream_id, session):
+        with self._lock:
+            stream = self._streams.get(stream_id)
+            if stream is None:
+                self._expire_idle(time.time())
+                finished = [key for key, other in self._streams.items() if other.finished_at is not None]
+                for key in finished[:max(0, len(finished) - self.history)]:
+                    del self._streams[key]
+                if sum(stream.finished_at is None for stream in self._streams.values()) >= self.max_active:
+                    return None
+                stream = self._streams[stream_id] = AudioStream(stream_id, session, VoiceActivityDetector())
+            return stream
+
+    def _save(self, stream, utterances):
+        self.root.mkdir(parents=True, exist_ok=True)
+        for samples in utterances:
+            path = self.root / f"{stream.id}-{len(stream.utterances) + 1:04d}.wav"
+            write_wav(path, samples)
+            stream.utterances.append(path)
+
+    def handle_chunk(self, body, headers, query):
+        """Asset-server route: ``POST /audio?id=<id>&offset=<bytes>``, raw int16 PCM."""
+        if len(body) % 2:
+            # A split sample would shift every later one and the offsets with it.
+            raise ValueError("body must hold whole 16-bit samples")
+        stream = self._open(self._stream_id(query), headers.get("X-Demo-Session", ""))
+        if stream is None:
+            return 503, {"error": "too many active streams", "retry_after_ms": 2000}
+        with stream.lock:
+            if stream.finished_at is not None:
+                return 409, {"error": "stream already finished", "offset": stream.offset}
+            if int(query.get("offset", "0")) != stream.offset:
+                return 409, {"error": "offset mismatch", "offset": stream.offset}
+            self._save(stream, stream.detector.process(body))
+            stream.offset += len(body)
+            stream.updated_at = time.time()
+            return 200, stream.stats()
+
+    def handle_finish(self, body, headers, query):
+        """Asset-server route: ``POST /audio/finish?id=<id>``."""
+        stream = self._streams.get(self._stream_id(query))
+        if stream is None:
+            return 404, {"error": "unknown stream"}
+        with stream.lock:
+            self._finish(stream)
+            return 200, stream.stats()
+
+    def streams(self, session=None):
+        """Streams still known, oldest first, optionally for one page session."""
+        with self._lock:
+            return [stream for stream in self._streams.values() if session in (None, stream.session)]
+
+
+@st.cache_resource(show_spinner=False)
+def audio_ingestor():
+    """The process-wide ingestor, reachable under ``/audio``."""
+    ingestor = AudioIngestor()
+    register_route("POST", "/audio", ingestor.handle_chunk)
+    register_route("POST", "/audio/finish", ingestor.handle_finish)
+    return ingestor